@@ -0,0 +1,131 @@
+import json
+import os
+import platform
+import threading
+
+# Bump whenever the layout of the cache file or of its entries changes
+CACHE_VERSION = 2
+
+
+def default_cache_dir():
+    """Per-user cache directory for the assistant"""
+    system = platform.system()
+    if system == "Windows":
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif system == "Darwin":
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'laptop-assistant')
+
+
+def dir_mtime(path):
+    """Directory modification time in ns, or None if it is gone"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class AppCacheStore:
+    """Versioned on-disk copy of the app scan, stored per search root.
+
+    Every search root ("source") is saved together with a stamp: a mapping
+    of probe keys (usually directory paths) to the value they had when the
+    root was scanned (usually the directory mtime). A source is reused on the
+    next start only if probing every key still gives the same value, so only
+    roots that actually changed get rescanned.
+    """
+
+    def __init__(self, os_type, path=None):
+        self.os_type = os_type
+        self.path = path or os.path.join(default_cache_dir(), 'app_cache.json')
+        self.sources = {}
+        self.dirty = False
+        # Scan workers look up and store sources concurrently
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Read the cache file, ignoring it if it is missing, corrupt or stale"""
+        self.sources = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
+        if data.get('version') != CACHE_VERSION or data.get('os') != self.os_type:
+            return
+        sources = data.get('sources')
+        if isinstance(sources, dict):
+            self.sources = sources
+
+    def save(self):
+        """Write the cache file atomically if anything changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {
+                'version': CACHE_VERSION,
+                'os': self.os_type,
+                'sources': dict(self.sources),
+            }
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Could not save app cache: {e}")
+
+    def clear(self):
+        """Forget every cached source (forces a full rebuild)"""
+        with self.lock:
+            if self.sources:
+                self.sources = {}
+                self.dirty = True
+
+    def lookup(self, source_id, probe):
+        """Return cached entries for a source if its stamp is still valid"""
+        with self.lock:
+            record = self.sources.get(source_id)
+        if not record:
+            return None
+        stamp = record.get('stamp') or {}
+        if not stamp:
+            return None
+        for key, value in stamp.items():
+            if probe(key) != value:
+                return None
+        return record.get('entries', {})
+
+    def entries(self, source_id):
+        """Entries currently stored for a source (empty if unknown)"""
+        with self.lock:
+            record = self.sources.get(source_id)
+            return record.get('entries', {}) if record else {}
+
+    def put(self, source_id, stamp, entries):
+        """Store freshly scanned entries for a source"""
+        with self.lock:
+            self.sources[source_id] = {'stamp': stamp, 'entries': entries}
+            self.dirty = True
+
+    def drop(self, source_id):
+        """Remove a source that can no longer be scanned"""
+        with self.lock:
+            if self.sources.pop(source_id, None) is not None:
+                self.dirty = True
+
+    def prune(self, keep):
+        """Remove every source not in keep (roots that disappeared)"""
+        with self.lock:
+            stale = [source_id for source_id in self.sources if source_id not in keep]
+            for source_id in stale:
+                del self.sources[source_id]
+            if stale:
+                self.dirty = True
@@ -0,0 +1,282 @@
+import heapq
+from collections import Counter, defaultdict
+
+# Minimum score for find_app to accept a match
+MATCH_THRESHOLD = 0.55
+
+# How many trigram neighbours are scored for typo matches
+CANDIDATE_LIMIT = 200
+
+# Keys up to this long can be an edit-distance match for a 2 character name
+SMALL_KEY_LENGTH = 4
+
+# Largest ranking bonus usage frequency can give a match (see boosts)
+USAGE_WEIGHT = 0.1
+
+
+def trigrams(text):
+    """Set of character trigrams in text (empty if shorter than 3)"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def levenshtein(a, b, max_distance=None):
+    """Edit distance between a and b using Myers' bit-parallel algorithm
+
+    Each column of the DP table is kept as bit vectors in a Python int, so a
+    comparison costs O(len(a)) big-int operations. If max_distance is given
+    and the lengths alone rule it out, max_distance + 1 is returned early.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if max_distance is not None and len(a) - m > max_distance:
+        return max_distance + 1
+    if m == 0:
+        return len(a)
+
+    peq = {}
+    for i, char in enumerate(b):
+        peq[char] = peq.get(char, 0) | (1 << i)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    distance = m
+    for char in a:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & full
+        mh = pv & xh
+        if ph & last:
+            distance += 1
+        elif mh & last:
+            distance -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
+    return distance
+
+
+def word_starts(key):
+    """Positions where a word starts in key (after any non-alphanumeric)"""
+    return [i for i in range(len(key)) if i == 0 or not key[i - 1].isalnum()]
+
+
+def match_score(query, key, query_words=None):
+    """Score in [0, 1] for how well key matches the spoken query
+
+    Ranks exact > prefix > substring > shared words > edit distance.
+    """
+    if key == query:
+        return 1.0
+    shorter, longer = sorted((len(query), len(key)))
+    ratio = shorter / longer if longer else 0.0
+
+    score = 0.0
+    if key.startswith(query) or query.startswith(key):
+        score = 0.8 + 0.15 * ratio
+    elif query in key:
+        start = key.find(query)
+        if not key[start - 1].isalnum():
+            # Starts a word inside the name, e.g. "code" in "visual-studio-code"
+            score = 0.6 + 0.2 * ratio
+        else:
+            # Buried mid-word, e.g. "code" in "bitcode"; only short names count
+            score = 0.3 + 0.4 * ratio
+    elif key in query and len(key) >= 4:
+        # Short names like "od" or "ls" hide inside too many words to count
+        score = 0.55 + 0.2 * ratio
+
+    if query_words is None:
+        query_words = set(query.split())
+    key_words = set(key.split())
+    shared = len(query_words & key_words)
+    if shared:
+        score = max(score, 0.5 + 0.3 * shared / len(query_words | key_words))
+
+    if score < 0.75:
+        # Only worth computing when it could still win; 0.75 is its ceiling
+        max_distance = longer // 2
+        distance = levenshtein(query, key, max_distance)
+        if distance <= max_distance:
+            score = max(score, 0.75 * (1 - distance / longer))
+    return score
+
+
+class AppIndex:
+    """Token and trigram index over app_cache keys.
+
+    Built once after a scan so lookups only look at keys that share a word
+    or a trigram with the spoken name instead of walking the whole cache.
+    """
+
+    def __init__(self, boosts=None):
+        self.keys = {}
+        # path -> 0..1 usage weight; frequently opened apps rank higher
+        # among similar matches but never clear the threshold on it alone
+        self.boosts = boosts if boosts is not None else {}
+        self.tokens = defaultdict(set)
+        self.grams = defaultdict(set)
+        # Keys too short to have a trigram are checked directly
+        self.short_keys = set()
+        # First one and two characters of every word -> keys, and each
+        # character of keys up to SMALL_KEY_LENGTH long -> those keys, for
+        # names too short for trigrams
+        self.prefixes = defaultdict(set)
+        self.small_keys = defaultdict(set)
+
+    def build(self, app_cache):
+        """Index every key of app_cache from scratch"""
+        self.keys = {}
+        self.tokens = defaultdict(set)
+        self.grams = defaultdict(set)
+        self.short_keys = set()
+        self.prefixes = defaultdict(set)
+        self.small_keys = defaultdict(set)
+        for key, path in app_cache.items():
+            self.add(key, path)
+
+    def add(self, key, path):
+        """Index a single key"""
+        if key in self.keys:
+            self.keys[key] = path
+            return
+        self.keys[key] = path
+        for word in key.split():
+            self.tokens[word].add(key)
+        grams = trigrams(key)
+        if grams:
+            for gram in grams:
+                self.grams[gram].add(key)
+        else:
+            self.short_keys.add(key)
+        for start in word_starts(key):
+            self.prefixes[key[start]].add(key)
+            if start + 1 < len(key):
+                self.prefixes[key[start:start + 2]].add(key)
+        if len(key) <= SMALL_KEY_LENGTH:
+            for char in set(key):
+                self.small_keys[char].add(key)
+
+    def remove(self, key):
+        """Drop a single key from the index"""
+        if self.keys.pop(key, None) is None:
+            return
+        for word in key.split():
+            self._discard(self.tokens, word, key)
+        for gram in trigrams(key):
+            self._discard(self.grams, gram, key)
+        self.short_keys.discard(key)
+        for start in word_starts(key):
+            self._discard(self.prefixes, key[start], key)
+            self._discard(self.prefixes, key[start:start + 2], key)
+        if len(key) <= SMALL_KEY_LENGTH:
+            for char in set(key):
+                self._discard(self.small_keys, char, key)
+
+    @staticmethod
+    def _discard(postings, term, key):
+        keys = postings.get(term)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del postings[term]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def substring_candidates(self, app_name):
+        """Keys that contain app_name or are contained in it"""
+        grams = trigrams(app_name)
+        if not grams:
+            return self.short_candidates(app_name)
+
+        # Every key containing app_name has all of its trigrams, and every
+        # key contained in app_name has only trigrams from it
+        postings = sorted((self.grams.get(gram, set()) for gram in grams), key=len)
+        contains = set.intersection(*postings) if postings[0] else set()
+        contained = set()
+        for keys in postings:
+            contained.update(keys)
+        contained.update(self.short_keys)
+
+        matches = {key for key in contains if app_name in key}
+        matches.update(key for key in contained if key in app_name)
+        return matches
+
+    def word_candidates(self, app_name):
+        """Keys sharing at least one whole word with app_name"""
+        matches = set()
+        for word in app_name.split():
+            matches.update(self.tokens.get(word, ()))
+        return matches
+
+    def trigram_candidates(self, app_name, limit=CANDIDATE_LIMIT):
+        """Keys sharing the most trigrams with app_name (for typo matches)"""
+        counts = Counter()
+        for gram in trigrams(app_name):
+            counts.update(self.grams.get(gram, ()))
+        return {key for key, _ in counts.most_common(limit)}
+
+    def short_candidates(self, app_name, limit=CANDIDATE_LIMIT):
+        """Keys worth scoring for a one or two character name
+
+        Only keys with a word starting with app_name, or keys short enough
+        to be a typo of it, can score well. Common letters start thousands
+        of names, so just the limit best placed (prefix of the whole key,
+        then shortest) are kept.
+        """
+        matches = set(self.prefixes.get(app_name, ()))
+        for char in set(app_name):
+            # Within edit distance of app_name only if they share a character
+            matches.update(key for key in self.small_keys.get(char, ())
+                           if len(key) <= 2 * len(app_name) or app_name in key)
+        if len(matches) <= limit:
+            return matches
+        return set(heapq.nsmallest(limit, matches,
+                                   key=lambda key: (not key.startswith(app_name), len(key), key)))
+
+    def candidates(self, app_name):
+        """Every key worth scoring for app_name"""
+        if len(app_name) < 3:
+            return self.short_candidates(app_name)
+        matches = self.substring_candidates(app_name)
+        matches.update(self.word_candidates(app_name))
+        matches.update(self.trigram_candidates(app_name))
+        return matches
+
+    def search(self, app_name, k=5):
+        """Top-k (name, path, score) matches for app_name, best first"""
+        if not app_name:
+            return []
+        words = set(app_name.split())
+        boosts = self.boosts
+        scored = []
+        for key in self.candidates(app_name):
+            score = match_score(app_name, key, words)
+            if score > 0:
+                path = self.keys[key]
+                rank = score + USAGE_WEIGHT * boosts.get(path, 0.0) if boosts else score
+                scored.append((rank, key, path, score))
+        # Ties go to the shorter name, then alphabetically, so results are stable
+        scored.sort(key=lambda item: (-item[0], len(item[1]), item[1]))
+        return [(key, path, score) for _, key, path, score in scored[:k]]
+
+    def best_match(self, app_name, threshold=MATCH_THRESHOLD):
+        """Best ranked key for app_name whose score clears threshold, else None"""
+        if app_name in self.keys:
+            return app_name
+        for key, _, score in self.search(app_name, k=5):
+            if score >= threshold:
+                return key
+        return None
+
+    def lookup(self, app_name):
+        """Path for the best match of app_name, or None"""
+        key = self.best_match(app_name)
+        if key is None:
+            return None
+        return self.keys[key]
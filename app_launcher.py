@@ -0,0 +1,167 @@
+import errno
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+
+def inherited_fds():
+    """Open descriptors above stderr a child would inherit, or None if unknown"""
+    for directory in ('/proc/self/fd', '/dev/fd'):
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        fds = []
+        for name in names:
+            fd = int(name)
+            if fd <= 2:
+                continue
+            try:
+                if os.get_inheritable(fd):
+                    fds.append(fd)
+            except OSError:
+                pass  # the descriptor used for the listing, closed by now
+        return fds
+    return None
+
+
+class SpawnedProcess:
+    """A child started with posix_spawn; poll() reaps it once it has exited"""
+
+    def __init__(self, pid, argv):
+        self.pid = pid
+        self.argv = argv
+        self.returncode = None
+        self._lock = threading.Lock()
+
+    def poll(self):
+        with self._lock:
+            if self.returncode is None:
+                try:
+                    pid, status = os.waitpid(self.pid, os.WNOHANG)
+                except ChildProcessError:
+                    self.returncode = 0  # already reaped
+                else:
+                    if pid:
+                        if os.WIFSIGNALED(status):
+                            self.returncode = -os.WTERMSIG(status)
+                        else:
+                            self.returncode = os.WEXITSTATUS(status)
+            return self.returncode
+
+
+class Launcher:
+    """Starts app commands directly, without a shell in between
+
+    A command is a cache value: an executable path, a command name or a
+    cleaned .desktop Exec= line. It is split into argv, argv[0] is resolved
+    on PATH once and remembered, and the program is started with
+    posix_spawn where available (subprocess.Popen otherwise) in a session of
+    its own with stdin on /dev/null. Children are reaped by a background
+    thread so exited apps don't linger as zombies.
+
+    posix_spawn doesn't close inherited descriptors the way Popen's
+    close_fds does, so every inheritable descriptor above stderr (ones
+    PortAudio or a TTS driver opened without close-on-exec) gets an
+    explicit close action. That costs a listing of /proc/self/fd per
+    launch; where the descriptors can't be listed, or one is closed by
+    another thread before the spawn, the launch goes through Popen instead.
+    """
+
+    def __init__(self, reap_interval=1.0):
+        self.reap_interval = reap_interval
+        self.use_posix_spawn = hasattr(os, 'posix_spawn')
+        self._resolved = {}
+        self._children = set()
+        self._cond = threading.Condition()
+        self._reaper = None
+
+    def argv_for(self, command):
+        """Split a cache value into an argument list"""
+        if isinstance(command, (list, tuple)):
+            return list(command)
+        if os.path.exists(command):
+            return [command]  # a path, possibly with spaces in it
+        try:
+            if sys.platform == 'win32':
+                return [arg.strip('"') for arg in shlex.split(command, posix=False)]
+            return shlex.split(command)
+        except ValueError:
+            return command.split()
+
+    def resolve(self, program):
+        """Absolute path for argv[0], or None if it isn't on PATH"""
+        path = self._resolved.get(program)
+        if path is None:
+            path = shutil.which(program)
+            if path is not None:
+                self._resolved[program] = path
+        return path
+
+    def launch(self, command):
+        """Start command; returns an object with pid and poll()
+
+        Raises FileNotFoundError if the program can't be found.
+        """
+        argv = self.argv_for(command)
+        if not argv:
+            raise FileNotFoundError(command)
+        path = self.resolve(argv[0])
+        if path is None:
+            raise FileNotFoundError(argv[0])
+        try:
+            process = self._spawn(path, argv)
+        except FileNotFoundError:
+            # Uninstalled since it was resolved; look it up again once
+            self._resolved.pop(argv[0], None)
+            path = self.resolve(argv[0])
+            if path is None:
+                raise
+            process = self._spawn(path, argv)
+        self._watch(process)
+        return process
+
+    def _spawn(self, path, argv):
+        fds = inherited_fds() if self.use_posix_spawn else None
+        if fds is not None:
+            file_actions = [(os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0)]
+            file_actions += [(os.POSIX_SPAWN_CLOSE, fd) for fd in fds]
+            try:
+                pid = os.posix_spawn(path, argv, os.environ, setsid=True, file_actions=file_actions)
+                return SpawnedProcess(pid, argv)
+            except OSError as e:
+                if e.errno != errno.EBADF:
+                    raise
+        if sys.platform == 'win32':
+            return subprocess.Popen([path] + argv[1:], stdin=subprocess.DEVNULL)
+        return subprocess.Popen([path] + argv[1:], stdin=subprocess.DEVNULL,
+                                start_new_session=True, close_fds=True)
+
+    def _watch(self, process):
+        with self._cond:
+            self._children.add(process)
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, name="reaper", daemon=True)
+                self._reaper.start()
+            self._cond.notify()
+
+    def _reap_loop(self):
+        while True:
+            with self._cond:
+                while not self._children:
+                    self._cond.wait()
+                children = list(self._children)
+            exited = [child for child in children if child.poll() is not None]
+            if exited:
+                with self._cond:
+                    self._children.difference_update(exited)
+            time.sleep(self.reap_interval)
+
+    def running(self):
+        """How many launched children haven't been reaped yet"""
+        with self._cond:
+            return len(self._children)
@@ -0,0 +1,177 @@
+import locale
+import os
+import shlex
+import stat
+
+from app_cache import dir_mtime
+
+# Exec= field codes that expand to files/URLs/icons; dropped when launching
+# without arguments (see the Desktop Entry Specification)
+EXEC_FIELD_CODES = {'%f', '%F', '%u', '%U', '%d', '%D', '%n', '%N', '%i', '%c', '%k', '%v', '%m'}
+
+
+def _executable_check():
+    """Return a function telling whether a stat result is executable for us
+
+    Same answer as os.access(path, os.X_OK) for the common cases, but works
+    on stat data we already have instead of costing another syscall.
+    """
+    if not hasattr(os, 'geteuid'):
+        return lambda st: True
+    euid = os.geteuid()
+    groups = set(os.getgroups()) | {os.getegid()}
+
+    def is_executable(st):
+        mode = st.st_mode
+        if euid == 0:
+            return bool(mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH))
+        if st.st_uid == euid:
+            return bool(mode & stat.S_IXUSR)
+        if st.st_gid in groups:
+            return bool(mode & stat.S_IXGRP)
+        return bool(mode & stat.S_IXOTH)
+    return is_executable
+
+
+def scan_bin_dir(path):
+    """Executables in one binary directory, as (entries, stamp)
+
+    Uses os.scandir so each file costs at most one stat() (none at all on
+    Windows, where DirEntry carries the stat data already).
+    """
+    is_executable = _executable_check()
+    entries = {}
+    stamp = {path: dir_mtime(path)}
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue  # dangling symlink
+            if stat.S_ISREG(st.st_mode) and is_executable(st):
+                entries[entry.name.lower()] = entry.name
+    return entries, stamp
+
+
+def _locale_suffixes():
+    """Localized key suffixes to index, e.g. ['de_DE', 'de'] for de_DE.UTF-8"""
+    lang = os.environ.get('LC_ALL') or os.environ.get('LC_MESSAGES') or os.environ.get('LANG')
+    if not lang:
+        try:
+            lang = locale.getlocale()[0]
+        except ValueError:
+            lang = None
+    if not lang or lang in ('C', 'POSIX'):
+        return []
+    lang = lang.split('.')[0].split('@')[0]
+    suffixes = [lang]
+    if '_' in lang:
+        suffixes.append(lang.split('_')[0])
+    return suffixes
+
+
+def clean_exec(command):
+    """Strip field codes like %U from an Exec= value"""
+    try:
+        args = shlex.split(command)
+    except ValueError:
+        return command.strip()
+    args = [arg.replace('%%', '%') for arg in args if arg not in EXEC_FIELD_CODES]
+    return ' '.join(shlex.quote(arg) for arg in args)
+
+
+def parse_desktop_file(path, locales=None):
+    """Read the [Desktop Entry] group of a .desktop file
+
+    Streams the file and stops at the next group header, so the actions and
+    translations further down are never read. Returns a dict with 'names',
+    'keywords' and 'exec', or None for hidden or non-application entries.
+    """
+    if locales is None:
+        locales = _locale_suffixes()
+    wanted_locales = set(locales)
+
+    fields = {}
+    in_entry = False
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('['):
+                    if in_entry:
+                        break
+                    in_entry = line == '[Desktop Entry]'
+                    continue
+                if not in_entry or '=' not in line:
+                    continue
+                key, value = line.split('=', 1)
+                key = key.strip()
+                if '[' in key and key[key.index('[') + 1:-1] not in wanted_locales:
+                    continue
+                fields[key] = value.strip()
+    except OSError:
+        return None
+
+    if fields.get('Type', 'Application') != 'Application':
+        return None
+    if fields.get('NoDisplay') == 'true' or fields.get('Hidden') == 'true':
+        return None
+
+    names = []
+    keywords = []
+    for loc in [None] + list(locales):
+        suffix = f'[{loc}]' if loc else ''
+        if fields.get('Name' + suffix):
+            names.append(fields['Name' + suffix])
+        if fields.get('GenericName' + suffix):
+            keywords.append(fields['GenericName' + suffix])
+        keywords.extend(k for k in fields.get('Keywords' + suffix, '').split(';') if k)
+
+    command = fields.get('Exec')
+    return {
+        'names': names,
+        'keywords': keywords,
+        'exec': clean_exec(command) if command else None,
+    }
+
+
+def desktop_entries(path, file, locales=None):
+    """Cache entries one .desktop file contributes, split by priority
+
+    Returns (primary, secondary): the file id and Name= values map straight
+    to the launch command, while GenericName= and Keywords= only fill in keys
+    nothing else claimed ("text editor" shouldn't shadow an app called that).
+    """
+    if not file.endswith('.desktop'):
+        return {}, {}
+    app_id = file[:-len('.desktop')]
+    entry = parse_desktop_file(os.path.join(path, file), locales)
+    if entry is None:
+        return {}, {}
+    command = entry['exec'] or app_id
+    primary = {app_id.lower(): command}
+    for name in entry['names']:
+        primary.setdefault(name.lower(), command)
+    secondary = {keyword.lower(): command for keyword in entry['keywords']}
+    return primary, secondary
+
+
+def scan_desktop_dir(path):
+    """Launchers described by the .desktop files in one directory"""
+    locales = _locale_suffixes()
+    entries = {}
+    secondary = {}
+    stamp = {path: dir_mtime(path)}
+    with os.scandir(path) as it:
+        for entry in it:
+            if not entry.name.endswith('.desktop'):
+                continue
+            primary, extra = desktop_entries(path, entry.name, locales)
+            entries.update(primary)
+            for key, command in extra.items():
+                secondary.setdefault(key, command)
+    for key, command in secondary.items():
+        entries.setdefault(key, command)
+    return entries, stamp
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+
+from app_cache import default_cache_dir
+
+# Bump whenever the layout of the usage file changes
+USAGE_VERSION = 1
+
+# Apps whose decayed count falls below this are forgotten on compaction
+MIN_SCORE = 0.05
+
+
+class UsageStore:
+    """Persistent record of which apps get opened, and by what name
+
+    Each app (by path) has a use count that halves every half_life_days, so
+    last month's favourite fades out. Spoken phrases that needed fuzzy
+    matching are remembered with the app they resolved to, so saying the
+    same thing again is a dict lookup. Both tables are bounded: once either
+    grows a quarter past its limit it is compacted back down.
+    """
+
+    def __init__(self, path=None, half_life_days=14.0, max_apps=500, max_phrases=1000):
+        self.path = path or os.path.join(default_cache_dir(), 'usage.json')
+        self.half_life = half_life_days * 86400
+        self.max_apps = max_apps
+        self.max_phrases = max_phrases
+        # path -> {'name': key, 'score': decayed count, 'updated': epoch seconds}
+        self.apps = {}
+        # phrase -> {'name': key, 'path': path, 'used': epoch seconds}
+        self.phrases = {}
+        # path -> 0..1 relative frequency; shared with AppIndex as its boosts
+        self.boosts = {}
+        self.dirty = False
+        self.last_save = 0.0
+        self.lock = threading.Lock()
+        self.load()
+
+    def _decayed(self, app, now):
+        elapsed = max(now - app['updated'], 0.0)
+        return app['score'] * 0.5 ** (elapsed / self.half_life)
+
+    def load(self):
+        """Read the usage file, ignoring it if it is missing, corrupt or stale"""
+        self.apps = {}
+        self.phrases = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if isinstance(data, dict) and data.get('version') == USAGE_VERSION:
+            if isinstance(data.get('apps'), dict):
+                self.apps = data['apps']
+            if isinstance(data.get('phrases'), dict):
+                self.phrases = data['phrases']
+        with self.lock:
+            self._compact(time.time())
+
+    def save(self, min_interval=0.0):
+        """Write the usage file atomically if anything changed
+
+        With min_interval, skip the write if the last one was more recent.
+        """
+        with self.lock:
+            if not self.dirty or time.monotonic() - self.last_save < min_interval:
+                return
+            data = {
+                'version': USAGE_VERSION,
+                'apps': {path: dict(app) for path, app in self.apps.items()},
+                'phrases': dict(self.phrases),
+            }
+            self.dirty = False
+            self.last_save = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not save usage history: {e}")
+
+    def record(self, phrase, name, path):
+        """Count one successful resolution of phrase to the app name -> path"""
+        now = time.time()
+        with self.lock:
+            app = self.apps.get(path)
+            score = self._decayed(app, now) if app else 0.0
+            self.apps[path] = {'name': name, 'score': score + 1.0, 'updated': now}
+            if phrase != name:
+                # Exact names are already O(1) through app_cache
+                self.phrases[phrase] = {'name': name, 'path': path, 'used': now}
+            self.dirty = True
+            if (len(self.apps) > self.max_apps * 1.25
+                    or len(self.phrases) > self.max_phrases * 1.25):
+                self._compact(now)
+            else:
+                self._update_boosts(now)
+
+    def recall(self, phrase):
+        """(name, path) this phrase resolved to last time, or None"""
+        memo = self.phrases.get(phrase)
+        if memo is None:
+            return None
+        return memo['name'], memo['path']
+
+    def forget(self, phrase):
+        """Drop a memo that no longer points at an installed app"""
+        with self.lock:
+            if self.phrases.pop(phrase, None) is not None:
+                self.dirty = True
+
+    def top(self, n=20):
+        """(name, path) of the n most used apps, most used first"""
+        now = time.time()
+        with self.lock:
+            ranked = sorted(self.apps.items(), key=lambda item: -self._decayed(item[1], now))
+        return [(app['name'], path) for path, app in ranked[:n]]
+
+    def _compact(self, now):
+        """Fold decay into the stored counts and trim both tables (lock held)"""
+        apps = {}
+        for path, app in self.apps.items():
+            score = self._decayed(app, now)
+            if score >= MIN_SCORE:
+                apps[path] = {'name': app['name'], 'score': score, 'updated': now}
+        if len(apps) > self.max_apps:
+            ranked = sorted(apps.items(), key=lambda item: -item[1]['score'])
+            apps = dict(ranked[:self.max_apps])
+        if len(apps) != len(self.apps):
+            self.dirty = True
+        self.apps = apps
+
+        if len(self.phrases) > self.max_phrases:
+            recent = sorted(self.phrases.items(), key=lambda item: -item[1]['used'])
+            self.phrases = dict(recent[:self.max_phrases])
+            self.dirty = True
+        self._update_boosts(now)
+
+    def _update_boosts(self, now):
+        scores = {path: self._decayed(app, now) for path, app in self.apps.items()}
+        top = max(scores.values(), default=0.0)
+        # Updated in place: AppIndex instances hold a reference to this dict
+        self.boosts.clear()
+        if top > 0:
+            self.boosts.update((path, score / top) for path, score in scores.items())
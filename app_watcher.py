@@ -0,0 +1,168 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+# inotify event bits (see <sys/inotify.h>)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Watch directories with Linux inotify; sleeps in select() when idle.
+
+    on_change(changes) is called from the watcher thread with a dict of
+    directory -> set of entry names that were created, removed or modified.
+    A set of None means events were lost and the whole directory is stale.
+    """
+
+    def __init__(self, directories, on_change, settle=0.2):
+        self.on_change = on_change
+        self.settle = settle
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.watches = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self.watches[wd] = directory
+        if not self.watches:
+            os.close(self.fd)
+            raise OSError("no directories could be watched")
+
+        # Writing to this pipe wakes the thread up so stop() is immediate
+        self.wake_r, self.wake_w = os.pipe()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, name="app-watch", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        try:
+            os.write(self.wake_w, b'x')
+        except OSError:
+            pass
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        for fd in (self.fd, self.wake_r, self.wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            ready, _, _ = select.select([self.fd, self.wake_r], [], [])
+            if self.wake_r in ready:
+                return
+
+            # Package installs touch many files at once; keep reading until
+            # things have been quiet for a moment and report them together
+            changes = {}
+            while ready:
+                self._read_events(changes)
+                ready, _, _ = select.select([self.fd], [], [], self.settle)
+            if changes:
+                self.on_change(changes)
+
+    def _read_events(self, changes):
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                for directory in self.watches.values():
+                    changes[directory] = None
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            names = changes.setdefault(directory, set())
+            if names is not None:
+                names.add(os.fsdecode(name))
+
+
+class PollingWatcher:
+    """Fallback watcher that compares directory mtimes every few seconds
+
+    Only directories whose mtime moved are listed again, so an idle system
+    costs one stat() per directory per interval. Permission changes on
+    existing files don't touch the directory mtime and are not noticed.
+    """
+
+    def __init__(self, directories, on_change, interval=5.0):
+        self.on_change = on_change
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.state = {}
+        for directory in directories:
+            self.state[directory] = self._snapshot(directory)
+
+    @staticmethod
+    def _snapshot(directory):
+        try:
+            return os.stat(directory).st_mtime_ns, set(os.listdir(directory))
+        except OSError:
+            return None, set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, name="app-watch", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            changes = {}
+            for directory, (mtime, names) in self.state.items():
+                try:
+                    current = os.stat(directory).st_mtime_ns
+                except OSError:
+                    current = None
+                if current == mtime:
+                    continue
+                new_mtime, new_names = self._snapshot(directory)
+                self.state[directory] = (new_mtime, new_names)
+                changed = names.symmetric_difference(new_names)
+                if changed:
+                    changes[directory] = changed
+            if changes:
+                self.on_change(changes)
+
+
+def create_watcher(directories, on_change, poll_interval=5.0):
+    """Best available watcher for this platform: inotify, else polling"""
+    directories = [d for d in directories if os.path.isdir(d)]
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directories, on_change)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directories, on_change, interval=poll_interval)
@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from command_context import CommandContext
+
+# Intents that only start something and don't depend on earlier commands;
+# runs of these are dispatched concurrently
+CONCURRENT_INTENTS = {'open'}
+
+
+def read_commands(stream):
+    """(line number, command) for every non-blank, non-comment line"""
+    for line_no, line in enumerate(stream, 1):
+        command = line.strip()
+        if command and not command.startswith('#'):
+            yield line_no, command.lower()
+
+
+class BatchResult:
+    """Outcome of one scripted command"""
+
+    def __init__(self, line_no, command, intent):
+        self.line_no = line_no
+        self.command = command
+        self.intent = intent
+        self.latency = 0.0
+        self.error = None
+        self.keep_going = True
+
+
+class BatchRunner:
+    """Runs a list of commands through process_command without a microphone
+
+    Consecutive launch commands ("open firefox", "open slack") go to a
+    bounded thread pool together. Any other command first waits for those
+    launches to finish, so "open x" followed by "close x" behaves exactly as
+    it would one at a time. A command counts as finished once the
+    background work it started has too. Results always come back in input
+    order.
+    """
+
+    def __init__(self, assistant, max_workers=4):
+        self.assistant = assistant
+        self.max_workers = max_workers
+
+    def _execute(self, result):
+        started = time.perf_counter()
+        context = CommandContext()
+        try:
+            result.keep_going = self.assistant.process_command(result.command, context)
+            # Playback and the like finish on other threads; a command is
+            # done (and timed) once those have
+            context.wait()
+        except Exception as e:
+            result.error = e
+        result.latency = time.perf_counter() - started
+        return result
+
+    def run(self, commands):
+        results = []
+        in_flight = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch") as executor:
+            for line_no, command in commands:
+                match = self.assistant.router.match(command)
+                result = BatchResult(line_no, command, match.intent.name if match else None)
+                results.append(result)
+
+                if result.intent in CONCURRENT_INTENTS:
+                    in_flight.append(executor.submit(self._execute, result))
+                    continue
+
+                # Barrier: everything launched so far finishes first
+                wait(in_flight)
+                in_flight = []
+                self._execute(result)
+                if not result.keep_going:
+                    break
+            wait(in_flight)
+        return results
+
+
+def print_report(results, wall_seconds):
+    """Per-command latency table plus totals"""
+    print("\n⏱️  Batch results:")
+    for result in results:
+        status = f"❌ {result.error}" if result.error else (result.intent or 'unknown')
+        print(f"   {result.latency * 1000:8.1f} ms  line {result.line_no:<4} {result.command}  [{status}]")
+    total = sum(result.latency for result in results)
+    rate = len(results) / wall_seconds if wall_seconds else 0.0
+    print(f"   {len(results)} commands in {wall_seconds * 1000:.1f} ms "
+          f"({total * 1000:.1f} ms if run one by one, {rate:.1f} commands/s)")
@@ -0,0 +1,121 @@
+"""Microbenchmark: listdir + isfile/access scanning vs the scandir scanner
+
+Builds a synthetic binary directory (20k entries by default: executables,
+plain files, symlinks and subdirectories) plus a folder of .desktop files,
+then times the old and new scanners on them.
+
+    python benchmarks/bench_scan.py [--entries 20000] [--repeat 5]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_scanner import scan_bin_dir, scan_desktop_dir  # noqa: E402
+
+
+def legacy_scan_bin_dir(path):
+    """The original _scan_linux_apps loop for one binary directory"""
+    entries = {}
+    for file in os.listdir(path):
+        file_path = os.path.join(path, file)
+        if os.path.isfile(file_path) and os.access(file_path, os.X_OK):
+            entries[file.lower()] = file
+    return entries
+
+
+def legacy_scan_desktop_dir(path):
+    """The original filename-only .desktop loop"""
+    entries = {}
+    for file in os.listdir(path):
+        if file.endswith('.desktop'):
+            entries[file.replace('.desktop', '').lower()] = file.replace('.desktop', '')
+    return entries
+
+
+DESKTOP_TEMPLATE = """[Desktop Entry]
+Type=Application
+Name=Synthetic App {i}
+Name[de]=Synthetische App {i}
+GenericName=Tool {i}
+Keywords=synthetic;bench{i};
+Exec=/opt/synthetic/app{i} %U
+
+[Desktop Action new-window]
+Name=New Window
+Exec=/opt/synthetic/app{i} --new-window
+"""
+
+
+def build_tree(root, entries):
+    """Create the synthetic bin and applications folders"""
+    bin_dir = os.path.join(root, 'bin')
+    app_dir = os.path.join(root, 'applications')
+    os.makedirs(bin_dir)
+    os.makedirs(app_dir)
+    for i in range(entries):
+        path = os.path.join(bin_dir, f'tool{i:05d}')
+        kind = i % 10
+        if kind == 8:
+            os.mkdir(path)
+        elif kind == 9 and hasattr(os, 'symlink'):
+            os.symlink(f'tool{i - 1:05d}', path)
+        else:
+            with open(path, 'w') as f:
+                f.write('#!/bin/sh\n')
+            # Roughly what /usr/bin looks like: most files are executable
+            os.chmod(path, 0o755 if kind < 7 else 0o644)
+    for i in range(max(entries // 50, 1)):
+        with open(os.path.join(app_dir, f'org.synthetic.App{i}.desktop'), 'w') as f:
+            f.write(DESKTOP_TEMPLATE.format(i=i))
+    return bin_dir, app_dir
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='assistant-bench-')
+    try:
+        bin_dir, app_dir = build_tree(root, args.entries)
+
+        old = legacy_scan_bin_dir(bin_dir)
+        new, _ = scan_bin_dir(bin_dir)
+        if old != new:
+            print(f"⚠️  Results differ: {len(old)} legacy vs {len(new)} scandir entries")
+
+        legacy = best_of(args.repeat, legacy_scan_bin_dir, bin_dir)
+        current = best_of(args.repeat, scan_bin_dir, bin_dir)
+        print(f"bin dir, {args.entries} entries ({len(new)} executables):")
+        print(f"   listdir + isfile/access: {legacy * 1000:8.2f} ms")
+        print(f"   scandir:                 {current * 1000:8.2f} ms  ({legacy / current:.2f}x)")
+
+        desktop_files = len(os.listdir(app_dir))
+        legacy = best_of(args.repeat, legacy_scan_desktop_dir, app_dir)
+        current = best_of(args.repeat, scan_desktop_dir, app_dir)
+        entries, _ = scan_desktop_dir(app_dir)
+        print(f".desktop dir, {desktop_files} files:")
+        print(f"   filenames only:          {legacy * 1000:8.2f} ms")
+        label = f"parsed ({len(entries)} keys):"
+        print(f"   {label:<25}{current * 1000:8.2f} ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Screenshot benchmark: how long a capture holds up the caller vs. encoding
+
+Captures a synthetic framebuffer (no display needed) and reports, per
+format and compression level, the time capture() blocks the calling thread
+next to the time the worker spends encoding, plus the file size. The
+"inline" row is the old behaviour: grab and encode before returning.
+
+    python benchmarks/bench_screenshot.py --size 3840x2160 --formats png,jpeg --levels 1,3,6
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from screen_capture import FakeFramebufferSource, ScreenCapture, encode_frame, pillow_formats  # noqa: E402
+
+
+def bench_inline(source, directory, level, repeat):
+    """Grab + PNG encode on the calling thread, like take_screenshot used to"""
+    blocked = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        encode_frame(source.grab(), os.path.join(directory, f"inline_{i}.png"), 'png',
+                     compress_level=level)
+        blocked.append(time.perf_counter() - started)
+    return blocked
+
+
+def bench_capture(source, directory, fmt, quality, level, repeat):
+    """(blocked seconds per capture, encode seconds per frame, bytes per frame)"""
+    capture = ScreenCapture(source, directory, fmt, quality, level)
+    blocked = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        capture.capture()
+        blocked.append(time.perf_counter() - started)
+        capture.wait()  # one at a time, so encode times don't overlap
+    capture.close()
+    frames = capture.stats['frames'] or 1
+    return blocked, capture.stats['encode_seconds'] / frames, capture.stats['bytes'] / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='3840x2160', metavar='WxH')
+    parser.add_argument('--formats', default='png,webp,jpeg',
+                        help="comma-separated; webp/jpeg are skipped without Pillow")
+    parser.add_argument('--levels', default='1,3,6,9', help="PNG compression levels to try")
+    parser.add_argument('--quality', type=int, default=85, help="webp/jpeg quality")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    print(f"Building a {width}x{height} framebuffer...")
+    source = FakeFramebufferSource(width, height)
+    available = pillow_formats() | {'png'}
+
+    print(f"{'mode':<16} {'blocked p50':>12} {'encode':>10} {'size':>10}")
+    levels = [int(v) for v in args.levels.split(',')]
+    with tempfile.TemporaryDirectory() as directory:
+        blocked = bench_inline(source, directory, levels[0], args.repeat)
+        print(f"{f'inline png/{levels[0]}':<16} {statistics.median(blocked) * 1000:>10.2f}ms "
+              f"{'-':>10} {'-':>10}")
+        for fmt in args.formats.split(','):
+            if fmt not in available:
+                print(f"{fmt:<16} skipped (needs Pillow with {fmt} support)")
+                continue
+            for level in (levels if fmt == 'png' else [None]):
+                blocked, encode, size = bench_capture(source, directory, fmt, args.quality,
+                                                      level if level is not None else 3, args.repeat)
+                label = f"{fmt}/{level}" if level is not None else f"{fmt}/q{args.quality}"
+                print(f"{label:<16} {statistics.median(blocked) * 1000:>10.2f}ms "
+                      f"{encode * 1000:>8.1f}ms {size / 1024:>8.0f}KB")
+
+
+if __name__ == '__main__':
+    main()
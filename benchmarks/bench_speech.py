@@ -0,0 +1,76 @@
+"""Speech latency benchmark: run WAV files through a recognizer backend
+
+No microphone and (with Vosk) no network needed. For every utterance the
+VAD finds, prints the text and how long the user would wait after they
+stopped talking ("decode"), which is the number the streaming backend is
+meant to bring down.
+
+    python benchmarks/bench_speech.py --backend vosk --vosk-model ~/vosk-model-small-en-us clip.wav
+    python benchmarks/bench_speech.py --backend google --realtime clip.wav
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speech_backends import (ListenTimeout, ServiceUnavailable, StreamingListener,  # noqa: E402
+                             WavFileSource, create_backend)
+
+
+def run_file(path, backend, realtime):
+    """Recognize every utterance in one file; returns a list of result dicts"""
+    listener = StreamingListener(WavFileSource(path, realtime=realtime), backend)
+    results = []
+    try:
+        while True:
+            try:
+                text = listener.listen(timeout=0, phrase_time_limit=15)
+            except ListenTimeout:
+                continue
+            except EOFError:
+                break
+            results.append(dict(listener.last_timing, text=text))
+    finally:
+        listener.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='+', metavar='WAV')
+    parser.add_argument('--backend', choices=['google', 'vosk'], default='vosk')
+    parser.add_argument('--vosk-model', metavar='DIR', help="Vosk model folder")
+    parser.add_argument('--realtime', action='store_true',
+                        help="pace frames like a live microphone")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    try:
+        backend = create_backend(args.backend, args.vosk_model)
+    except ServiceUnavailable as e:
+        sys.exit(f"❌ {e}")
+
+    report = {}
+    for path in args.files:
+        report[path] = run_file(path, backend, args.realtime)
+
+    if args.json:
+        print(json.dumps({'backend': args.backend, 'files': report}, indent=2))
+        return
+    decode_times = []
+    for path, results in report.items():
+        print(f"{path}:")
+        for result in results:
+            decode_times.append(result['decode'])
+            print(f"   {result['decode'] * 1000:7.1f} ms after speech "
+                  f"({result['speech']:.2f}s spoken)  {result['text']!r}")
+    if decode_times:
+        decode_times.sort()
+        print(f"\n{len(decode_times)} utterances, median {decode_times[len(decode_times) // 2] * 1000:.1f} ms, "
+              f"max {decode_times[-1] * 1000:.1f} ms after the speaker stopped")
+
+
+if __name__ == '__main__':
+    main()
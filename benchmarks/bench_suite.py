@@ -0,0 +1,277 @@
+"""Benchmark suite for the scan, lookup and dispatch hot paths
+
+Builds the assistant without a microphone (voice_input=False) and with the
+null TTS backend, points it at synthetic app trees and measures:
+
+  * cold scan: first start, empty app cache
+  * warm start: second start, every root reused from the app cache
+  * find_app latency percentiles over a mix of exact, prefix, typo and
+    unknown names
+  * process_command throughput (launches are dry-run, nothing is started)
+
+Results are written as JSON; --compare prints the change against an
+earlier results file and exits non-zero on regressions.
+
+    python benchmarks/bench_suite.py --output bench.json
+    python benchmarks/bench_suite.py --sizes 1000 10000 --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import UniversalVoiceAssistant  # noqa: E402
+
+BIN_DIRS = 4
+DESKTOP_TEMPLATE = """[Desktop Entry]
+Type=Application
+Name=Synthetic Tool {i}
+Keywords=synthetic;bench;
+Exec=/opt/synthetic/tool{i} %U
+"""
+
+COMMANDS = [
+    "what time is it",
+    "what is the date today",
+    "open synthetic tool 42",
+    "open tol0042",
+    "open qqqq zzzz",
+    "list apps like tool",
+    "volume",
+    "play something on youtube please not",
+    "help",
+]
+
+
+class BenchAssistant(UniversalVoiceAssistant):
+    """Assistant that scans a synthetic tree and never launches anything"""
+
+    def __init__(self, tree, **kwargs):
+        self.tree = tree
+        super().__init__(tts_backend='null', voice_input=False, **kwargs)
+
+    def _scan_windows_apps(self):
+        self._scan_synthetic()
+
+    def _scan_macos_apps(self):
+        self._scan_synthetic()
+
+    def _scan_linux_apps(self):
+        self._scan_synthetic()
+
+    def _scan_synthetic(self):
+        from app_scanner import scan_bin_dir, scan_desktop_dir
+        for i in range(BIN_DIRS):
+            path = os.path.join(self.tree, f'bin{i}')
+            self._scan_flat_dir(f"bin:{path}", path, scan_bin_dir, self._bin_entries, self._bin_keys)
+        path = os.path.join(self.tree, 'applications')
+        self._scan_flat_dir(f"desktop:{path}", path, scan_desktop_dir)
+
+    def open_application(self, app_name):
+        # Dry run: resolve but don't start a process
+        return self.find_app(app_name) is not None
+
+    def open_website(self, site_name):
+        pass
+
+    def play_song_youtube(self, song_name):
+        pass
+
+
+def build_tree(root, size):
+    """Synthetic install: size executables over a few folders plus .desktop files"""
+    names = []
+    for i in range(BIN_DIRS):
+        os.makedirs(os.path.join(root, f'bin{i}'))
+    for i in range(size):
+        name = f'tool{i:06d}' if i % 3 else f'synthetic-app-{i}'
+        path = os.path.join(root, f'bin{i % BIN_DIRS}', name)
+        with open(path, 'w') as f:
+            f.write('#!/bin/sh\n')
+        os.chmod(path, 0o755)
+        names.append(name)
+    app_dir = os.path.join(root, 'applications')
+    os.makedirs(app_dir)
+    for i in range(max(size // 50, 1)):
+        with open(os.path.join(app_dir, f'org.synthetic.Tool{i}.desktop'), 'w') as f:
+            f.write(DESKTOP_TEMPLATE.format(i=i))
+    return names
+
+
+def lookup_queries(names, count, seed=1234):
+    """Mix of exact names, prefixes, one-typo names and misses"""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        name = rng.choice(names)
+        kind = i % 4
+        if kind == 0:
+            queries.append(name)
+        elif kind == 1:
+            queries.append(name[:max(len(name) - 2, 3)])
+        elif kind == 2:
+            pos = rng.randrange(len(name))
+            queries.append(name[:pos] + 'x' + name[pos + 1:])
+        else:
+            queries.append(f'nothing like {rng.randrange(10 ** 6)}')
+    return queries
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+
+    def at(p):
+        return samples[min(int(p / 100 * len(samples)), len(samples) - 1)]
+    return {
+        'p50_us': at(50) * 1e6,
+        'p90_us': at(90) * 1e6,
+        'p99_us': at(99) * 1e6,
+        'max_us': samples[-1] * 1e6,
+        'mean_us': sum(samples) / len(samples) * 1e6,
+    }
+
+
+def start_assistant(tree, cache_path, usage_path):
+    """Construct the assistant and wait for the scan; returns (assistant, seconds)"""
+    started = time.perf_counter()
+    assistant = BenchAssistant(tree, cache_path=cache_path, usage_path=usage_path)
+    assistant.scan_done.wait()
+    return assistant, time.perf_counter() - started
+
+
+def bench_size(size, lookups, commands):
+    root = tempfile.mkdtemp(prefix=f'assistant-bench-{size}-')
+    try:
+        names = build_tree(root, size)
+        cache_path = os.path.join(root, 'app_cache.json')
+        usage_path = os.path.join(root, 'usage.json')
+
+        assistant, cold = start_assistant(root, cache_path, usage_path)
+        assistant.shutdown()
+        assistant, warm = start_assistant(root, cache_path, usage_path)
+
+        timings = []
+        for query in lookup_queries(names, lookups):
+            started = time.perf_counter()
+            assistant.find_app(query)
+            timings.append(time.perf_counter() - started)
+
+        # Replies are printed; keep that cost but not the terminal noise
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            for i in range(commands):
+                assistant.process_command(COMMANDS[i % len(COMMANDS)])
+            dispatch = time.perf_counter() - started
+        apps = len(assistant.app_cache)
+        assistant.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        'apps': apps,
+        'cold_scan_s': cold,
+        'warm_start_s': warm,
+        'lookup': percentiles(timings),
+        'commands_per_s': commands / dispatch if dispatch else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=5)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# (metric path, higher is better)
+COMPARED = [
+    (('cold_scan_s',), False),
+    (('warm_start_s',), False),
+    (('lookup', 'p50_us'), False),
+    (('lookup', 'p99_us'), False),
+    (('commands_per_s',), True),
+]
+
+
+def compare(old, new, tolerance):
+    """Print metric changes; returns the number of regressions beyond tolerance"""
+    regressions = 0
+    print(f"\nCompared with {old['meta'].get('revision') or 'previous run'} "
+          f"({old['meta'].get('timestamp', '?')}):")
+    for size, result in new['results'].items():
+        previous = old['results'].get(size)
+        if previous is None:
+            continue
+        print(f"  {size} apps:")
+        for path, higher_is_better in COMPARED:
+            before, after = previous, result
+            for key in path:
+                before, after = before[key], after[key]
+            change = (after - before) / before if before else 0.0
+            worse = -change if higher_is_better else change
+            flag = ''
+            if worse > tolerance:
+                flag = '  ❌ regression'
+                regressions += 1
+            elif worse < -tolerance:
+                flag = '  ✅'
+            print(f"     {'.'.join(path):<16} {before:12.4f} -> {after:12.4f}  ({change * 100:+.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--commands', type=int, default=2000)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', metavar='JSON', help="earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="relative change counted as a regression (default 0.15)")
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': {},
+    }
+    for size in args.sizes:
+        print(f"⏱️  {size} apps...", flush=True)
+        result = bench_size(size, args.lookups, args.commands)
+        report['results'][str(size)] = result
+        lookup = result['lookup']
+        print(f"   cold scan {result['cold_scan_s'] * 1000:.1f} ms, warm start {result['warm_start_s'] * 1000:.1f} ms, "
+              f"lookup p50 {lookup['p50_us']:.0f} µs / p99 {lookup['p99_us']:.0f} µs, "
+              f"{result['commands_per_s']:.0f} commands/s")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        if compare(old, report, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Wake word harness: feed recorded WAV files through the wake stage
+
+Prints where in each file the wake phrase was detected and how much CPU
+the wake stage used. With --expect, exits non-zero if any file produced a
+different number of detections, so recordings can be used as a check.
+
+    python benchmarks/bench_wake_word.py --vosk-model DIR --wake-word "hey assistant" \\
+        --expect 2 two_wakeups.wav --expect 0 tv_noise.wav
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speech_backends import ServiceUnavailable, WavFileSource  # noqa: E402
+from wake_word import VoskKeywordSpotter, WakeWordDetector  # noqa: E402
+
+
+def run_file(path, model, phrase, realtime):
+    """Detection times (seconds into the file) and the detector for one file"""
+    source = WavFileSource(path, realtime=realtime)
+    detector = WakeWordDetector(source, VoskKeywordSpotter(model, phrase, source.sample_rate))
+    try:
+        while True:
+            try:
+                detector.wait()
+            except EOFError:
+                break
+    finally:
+        source.close()
+    return detector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='+', metavar='WAV')
+    parser.add_argument('--wake-word', default='hey assistant')
+    parser.add_argument('--vosk-model', metavar='DIR', required=True)
+    parser.add_argument('--expect', type=int, action='append', default=[],
+                        help="expected detections, one per file in order")
+    parser.add_argument('--realtime', action='store_true',
+                        help="pace frames like a live microphone (for idle CPU numbers)")
+    args = parser.parse_args()
+
+    if args.expect and len(args.expect) != len(args.files):
+        parser.error("give one --expect per file")
+
+    failures = 0
+    for i, path in enumerate(args.files):
+        try:
+            detector = run_file(path, args.vosk_model, args.wake_word, args.realtime)
+        except ServiceUnavailable as e:
+            sys.exit(f"❌ {e}")
+        times = ', '.join(f"{t:.2f}s" for t in detector.detection_times) or 'none'
+        status = ''
+        if args.expect:
+            expected = args.expect[i]
+            ok = expected == len(detector.detection_times)
+            failures += not ok
+            status = '✅ ' if ok else f'❌ expected {expected}, '
+        print(f"{status}{path}: detections at {times}")
+        print(f"   {detector.report()}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
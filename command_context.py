@@ -0,0 +1,84 @@
+import contextvars
+import threading
+
+# The command whose handler (or follow-up work) is running right now
+_current = contextvars.ContextVar('command', default=None)
+
+
+class WorkTracker:
+    """Counts follow-up work that has been started but hasn't finished"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = 0
+
+    def begin(self):
+        with self._cond:
+            self._pending += 1
+
+    def end(self):
+        with self._cond:
+            self._pending -= 1
+            if self._pending <= 0:
+                self._pending = 0
+                self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until nothing is pending; False if timeout ran out first"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending <= 0, timeout)
+
+
+class CommandContext(WorkTracker):
+    """One command plus the follow-up work it started
+
+    Actions hand slow steps to other threads (YouTube playback, closing an
+    app, saving a screenshot); those count as part of the command, so
+    callers that need the whole outcome (batch runs, the control server)
+    can wait() for them. on_reply, if given, gets every reply spoken for
+    the command, from whichever thread speaks it.
+
+    remote marks a command that came from another program rather than the
+    microphone: its replies are only said aloud if aloud is set, and the
+    voice loop never waits for them.
+    """
+
+    def __init__(self, on_reply=None, remote=False, aloud=True):
+        super().__init__()
+        self.on_reply = on_reply
+        self.remote = remote
+        self.aloud = aloud
+
+
+def current_command():
+    """CommandContext of the command being processed, or None"""
+    return _current.get()
+
+
+def run_in_command(context, function, *args):
+    """Call function with context as the current command"""
+    token = _current.set(context)
+    try:
+        return function(*args)
+    finally:
+        _current.reset(token)
+
+
+def follow_up(callback, *trackers):
+    """Wrap callback to run later, on any thread, as part of the current command
+
+    The current command and every tracker count the callback as pending
+    until the wrapper has been called once.
+    """
+    trackers = [tracker for tracker in (current_command(),) + trackers if tracker is not None]
+    for tracker in trackers:
+        tracker.begin()
+    context = contextvars.copy_context()
+
+    def run(*args):
+        try:
+            return context.run(callback, *args)
+        finally:
+            for tracker in trackers:
+                tracker.end()
+    return run
@@ -0,0 +1,402 @@
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app_cache import default_cache_dir
+from command_context import CommandContext
+
+# Longest request line accepted, in bytes
+MAX_LINE = 64 * 1024
+
+# How an HTTP request starts; a web page can POST to a localhost port, so a
+# connection that talks HTTP is dropped before its body is ever read
+HTTP_METHODS = (b'GET ', b'POST ', b'PUT ', b'HEAD ', b'OPTIONS ', b'DELETE ', b'PATCH ',
+                b'CONNECT ', b'TRACE ')
+
+
+def default_address():
+    """A Unix socket next to the app cache, or a localhost port on Windows"""
+    if sys.platform == 'win32':
+        return '127.0.0.1:8765'
+    return os.path.join(default_cache_dir(), 'control.sock')
+
+
+def default_token_path():
+    """Where a TCP server writes the token its clients must send"""
+    return os.path.join(default_cache_dir(), 'control.token')
+
+
+def parse_address(address):
+    """('unix', path) or ('tcp', (host, port)) for an address string
+
+    Accepts 'unix:/path', a path containing '/', 'host:port' or a bare
+    port (bound to 127.0.0.1).
+    """
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    if '/' in address:
+        return 'unix', address
+    host, _, port = address.rpartition(':')
+    return 'tcp', (host or '127.0.0.1', int(port))
+
+
+class ControlServer:
+    """Local socket that lets other programs drive the assistant
+
+    The protocol is one JSON object per line in each direction, over a Unix
+    socket (owner-only permissions) or a localhost TCP port. Any program
+    (or web page) can reach a TCP port, so there the first request must be
+
+        {"op": "auth", "token": "<contents of token_path>"}
+
+    with a token made fresh for each run and written to an owner-only file.
+    A line that isn't a JSON object (an HTTP request, say) ends the
+    connection on either transport. Requests:
+
+        {"id": 1, "op": "command", "text": "open firefox"}
+        {"id": 2, "op": "find_app", "name": "fire fox", "k": 5}
+        {"id": 3, "op": "apps", "query": "code", "limit": 20}
+        {"id": 4, "op": "subscribe"}
+        {"id": 5, "op": "stats"}
+
+    A command streams {"event": "reply", "text": ...} for every reply it
+    speaks, including ones from work it left running in the background
+    (playback, saving a screenshot), then {"event": "done", ...} once that
+    work has finished. Replies are only sent, not said aloud, unless the
+    request has "speak": true, and even then only when nothing else is
+    being said, so clients can't keep the voice loop from listening. A command that ends the session ("exit") stops the
+    assistant's loop. The other ops answer with one {"event": "result", ...}.
+    Every response echoes the request id.
+
+    The server runs its own event loop on a background thread, and commands
+    run on a small thread pool, so the voice loop never waits for it. Work
+    is bounded: past max_pending commands/lookups in flight, new ones are
+    answered with a "busy" error at once; a client with max_per_client
+    requests in flight isn't read from until one finishes; replies to a
+    client that doesn't read them are dropped rather than buffered forever.
+    """
+
+    def __init__(self, assistant, address=None, max_workers=2, max_pending=8,
+                 max_per_client=4, max_queued_events=256, token_path=None):
+        self.assistant = assistant
+        self.address = address or default_address()
+        self.kind, self.target = parse_address(self.address)
+        # Only TCP needs a token; the Unix socket's permissions do that job
+        self.token = secrets.token_urlsafe(32) if self.kind == 'tcp' else None
+        self.token_path = (token_path or default_token_path()) if self.kind == 'tcp' else None
+        self.max_pending = max_pending
+        self.max_per_client = max_per_client
+        self.max_queued_events = max_queued_events
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="control")
+        self.stats = {'clients': 0, 'requests': 0, 'busy': 0, 'dropped_events': 0, 'rejected': 0}
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._pending = 0
+        self._subscribers = set()
+        self._writers = set()
+        self._ready = threading.Event()
+        self._error = None
+
+    # ------------------------------------------------------------ lifecycle
+
+    def start(self):
+        """Start listening on a background thread; raises if binding fails"""
+        self.thread = threading.Thread(target=self._run, name="control-server", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        self.assistant.reply_hooks.append(self._on_reply)
+
+    def stop(self):
+        if self.loop is None:
+            return
+        if self._on_reply in self.assistant.reply_hooks:
+            self.assistant.reply_hooks.remove(self._on_reply)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.executor.shutdown(wait=False)
+        for path in (self.target if self.kind == 'unix' else None, self.token_path):
+            if path is None:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(self._listen())
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            self.loop.close()
+            return
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            # Stopped: hang up on every client and give their handlers a
+            # moment to see the end of input and finish
+            self.server.close()
+            for writer in list(self._writers):
+                writer.close()
+            tasks = asyncio.all_tasks(self.loop)
+            if tasks:
+                self.loop.run_until_complete(asyncio.wait(tasks, timeout=2))
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
+
+    async def _listen(self):
+        if self.kind == 'unix':
+            os.makedirs(os.path.dirname(self.target) or '.', exist_ok=True)
+            if os.path.exists(self.target):
+                os.remove(self.target)  # left over from a run that crashed
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # Bound under a umask that makes the socket owner-only from the
+            # start; a chmod after bind would leave a window to connect in
+            old_umask = os.umask(0o177)
+            try:
+                sock.bind(self.target)
+            except OSError:
+                sock.close()
+                raise
+            finally:
+                os.umask(old_umask)
+            return await asyncio.start_unix_server(self._handle, sock=sock, limit=MAX_LINE)
+        self._write_token()
+        host, port = self.target
+        return await asyncio.start_server(self._handle, host, port, limit=MAX_LINE)
+
+    def _write_token(self):
+        """Write the token to a new file only the current user can read"""
+        os.makedirs(os.path.dirname(self.token_path) or '.', exist_ok=True)
+        try:
+            os.remove(self.token_path)
+        except FileNotFoundError:
+            pass
+        # O_EXCL: never write through a file (or link) someone put there
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.token + '\n')
+
+    # ------------------------------------------------------------ connections
+
+    async def _handle(self, reader, writer):
+        self.stats['clients'] += 1
+        self._writers.add(writer)
+        events = asyncio.Queue(self.max_queued_events)
+        sender = asyncio.ensure_future(self._send(events, writer))
+        tasks = set()
+        authenticated = self.token is None
+        try:
+            while True:
+                if len(tasks) >= self.max_per_client:
+                    # Stop reading; the client's writes back up instead
+                    _, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    await events.put({'event': 'error', 'error': 'request too long'})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                request = self._parse(line)
+                if request is None:
+                    # Not a client of ours: hang up rather than guess which
+                    # lines were meant as requests
+                    self.stats['rejected'] += 1
+                    if not line.startswith(HTTP_METHODS):
+                        await events.put({'event': 'error', 'error': "expected a JSON object per line"})
+                    break
+                if request.get('op') == 'auth' or not authenticated:
+                    authenticated = self._authenticate(request)
+                    if not authenticated:
+                        self.stats['rejected'] += 1
+                        await events.put({'event': 'error', 'error': "unauthorized",
+                                          'id': request.get('id')})
+                        break
+                    await events.put({'event': 'result', 'authenticated': True,
+                                      'id': request.get('id')})
+                    continue
+                self.stats['requests'] += 1
+                tasks.add(asyncio.ensure_future(self._request(request, events)))
+                tasks = {task for task in tasks if not task.done()}
+            if tasks:
+                await asyncio.wait(tasks)
+            await events.put(None)
+            await sender
+        finally:
+            self._subscribers.discard(events)
+            self._writers.discard(writer)
+            sender.cancel()  # no-op once it has finished
+            writer.close()
+
+    async def _send(self, events, writer):
+        connected = True
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            if not connected:
+                continue  # keep draining so pending requests can finish
+            try:
+                writer.write(json.dumps(event).encode('utf-8') + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+
+    def _offer(self, events, event):
+        """Queue an event without waiting; dropped if the client is behind"""
+        try:
+            events.put_nowait(event)
+        except asyncio.QueueFull:
+            self.stats['dropped_events'] += 1
+
+    def _post(self, callback, *args):
+        """Run callback on the event loop from any thread (dropped once stopped)"""
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # loop closed
+
+    def _on_reply(self, text):
+        """assistant.reply_hooks entry; called on whichever thread spoke"""
+        if self._subscribers:
+            self._post(self._broadcast, text)
+
+    def _broadcast(self, text):
+        for events in list(self._subscribers):
+            self._offer(events, {'event': 'reply', 'text': text, 'subscription': True})
+
+    # ------------------------------------------------------------ requests
+
+    @staticmethod
+    def _parse(line):
+        """The request object on line, or None if it isn't one"""
+        if line.startswith(HTTP_METHODS):
+            return None
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return None
+        return request if isinstance(request, dict) else None
+
+    def _authenticate(self, request):
+        """True if request is an auth op with the right token (or none is needed)"""
+        if self.token is None:
+            return True
+        token = request.get('token')
+        if request.get('op') != 'auth' or not isinstance(token, str):
+            return False
+        return hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8'))
+
+    async def _request(self, request, events):
+        request_id = request.get('id')
+        try:
+            op = request.get('op')
+            handler = getattr(self, f"_op_{op}", None) if isinstance(op, str) else None
+            if handler is None:
+                raise ValueError(f"unknown op {op!r}")
+            response = await handler(request, events)
+        except ValueError as e:
+            response = {'event': 'error', 'error': str(e)}
+        except Exception as e:
+            response = {'event': 'error', 'error': f"{type(e).__name__}: {e}"}
+        response['id'] = request_id
+        await events.put(response)
+
+    def _reserve(self):
+        """Count one more request in flight, or refuse with "busy" """
+        if self._pending >= self.max_pending:
+            self.stats['busy'] += 1
+            raise ValueError("busy")
+        self._pending += 1
+
+    async def _in_worker(self, function, *args):
+        """Run function on the thread pool, or refuse if too much is in flight"""
+        self._reserve()
+        try:
+            return await self.loop.run_in_executor(self.executor, function, *args)
+        finally:
+            self._pending -= 1
+
+    @staticmethod
+    def _text(request, field):
+        value = request.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"'{field}' must be a non-empty string")
+        return value
+
+    async def _op_command(self, request, events):
+        text = self._text(request, 'text')
+        intent = self.assistant.router.match(text)
+        context = CommandContext(on_reply=lambda reply: self._post(
+            self._offer, events, {'event': 'reply', 'text': reply, 'id': request.get('id')}),
+            remote=True, aloud=request.get('speak') is True)
+        self._reserve()
+        started = time.perf_counter()
+        try:
+            keep_going = await self.loop.run_in_executor(
+                self.executor, self.assistant.process_command, text, context)
+            # Background steps may still speak; wait for them off the pool
+            # so they don't hold a command worker
+            await self.loop.run_in_executor(None, context.wait)
+        finally:
+            self._pending -= 1
+        if not keep_going:
+            self.assistant.exit_requested.set()
+        return {'event': 'done', 'intent': intent.intent.name if intent else None,
+                'keep_going': keep_going, 'ms': round((time.perf_counter() - started) * 1000, 3)}
+
+    async def _op_find_app(self, request, events):
+        name = self._text(request, 'name')
+        k = int(request.get('k', 5))
+        entry, candidates = await self._in_worker(
+            lambda: (self.assistant.find_app_entry(name), self.assistant.find_app_candidates(name, k)))
+        return {'event': 'result',
+                'match': {'name': entry[0], 'path': entry[1]} if entry else None,
+                'candidates': [{'name': key, 'path': path, 'score': round(score, 3)}
+                               for key, path, score in candidates]}
+
+    async def _op_apps(self, request, events):
+        assistant = self.assistant
+        limit = request.get('limit')
+        query = self._text(request, 'query') if request.get('query') else None
+
+        def collect():
+            # Copying a large cache (or waiting out a merge) happens here,
+            # off the event loop
+            if query:
+                matches = assistant.find_app_candidates(query, int(limit or 20))
+                apps = {key: path for key, path, _ in matches}
+            else:
+                with assistant.scan_lock:
+                    apps = dict(assistant.app_cache)
+                if limit is not None:
+                    apps = dict(sorted(apps.items())[:int(limit)])
+            return apps, len(assistant.app_cache)
+
+        apps, count = await self._in_worker(collect)
+        return {'event': 'result', 'count': count,
+                'scan_done': assistant.scan_done.is_set(), 'apps': apps}
+
+    async def _op_subscribe(self, request, events):
+        self._subscribers.add(events)
+        return {'event': 'result', 'subscribed': True}
+
+    async def _op_stats(self, request, events):
+        return {'event': 'result', 'latency': self.assistant.tracer.snapshot(),
+                'server': dict(self.stats, pending=self._pending)}
@@ -0,0 +1,135 @@
+import re
+
+
+class Intent:
+    """One command the assistant understands
+
+    phrases trigger the intent; if requires is given, at least one of those
+    phrases must be heard as well. keywords are extra words the handler wants
+    to look at (e.g. "up"/"down" for volume). strip lists the phrases removed
+    when extracting the slot; it defaults to phrases + requires.
+    """
+
+    def __init__(self, name, phrases, handler, requires=(), keywords=(), strip=None):
+        self.name = name
+        self.phrases = [normalize(p) for p in phrases]
+        self.handler = handler
+        self.requires = [normalize(p) for p in requires]
+        self.keywords = [normalize(p) for p in keywords]
+        if strip is None:
+            strip = list(phrases) + list(requires)
+        self.strip = [normalize(p) for p in strip]
+
+
+class IntentMatch:
+    """Result of routing one command: the intent plus every phrase heard"""
+
+    def __init__(self, intent, command, hits):
+        self.intent = intent
+        self.command = command
+        # (phrase, start, end) in the order they appear in the command
+        self.hits = hits
+
+    def has(self, *phrases):
+        """True if any of the phrases was heard as a whole word"""
+        return any(hit[0] in phrases for hit in self.hits)
+
+    def after(self, phrase):
+        """Text following the first occurrence of phrase, or '' if absent"""
+        for hit, _, end in self.hits:
+            if hit == phrase:
+                return self.command[end:].strip()
+        return ''
+
+    def slot(self, strip=None, fillers=()):
+        """Command text with the trigger spans cut out
+
+        Only whole-word hits are removed, so "for" in "california" or
+        "open" in "opener" are left alone. Leading filler words such as
+        "for" in "search for cats" are dropped as well.
+        """
+        if strip is None:
+            strip = self.intent.strip
+        parts = []
+        last = 0
+        for phrase, start, end in self.hits:
+            if phrase in strip:
+                parts.append(self.command[last:start])
+                last = end
+        parts.append(self.command[last:])
+        words = ' '.join(parts).split()
+        while words and words[0] in fillers:
+            words.pop(0)
+        return ' '.join(words)
+
+
+def normalize(text):
+    """Lower-case and collapse whitespace"""
+    return ' '.join(text.lower().split())
+
+
+class IntentRouter:
+    """Table-driven command router
+
+    All phrases from every registered intent are compiled into a single
+    word-boundary regex, so a command is scanned once no matter how many
+    intents there are. Intents are tried in registration order, which acts
+    as their priority.
+    """
+
+    def __init__(self):
+        self.intents = []
+        self._pattern = None
+
+    def register(self, name, phrases, handler, requires=(), keywords=(), strip=None, before=None):
+        """Add an intent; before=<intent name> gives it higher priority than that one"""
+        intent = Intent(name, phrases, handler, requires, keywords, strip)
+        index = len(self.intents)
+        if before is not None:
+            for i, existing in enumerate(self.intents):
+                if existing.name == before:
+                    index = i
+                    break
+        self.intents.insert(index, intent)
+        self._pattern = None
+        return intent
+
+    def _compile(self):
+        vocabulary = set()
+        for intent in self.intents:
+            vocabulary.update(intent.phrases, intent.requires, intent.keywords, intent.strip)
+        # Longest first so "on youtube" wins over "youtube" at the same spot
+        alternatives = sorted(vocabulary, key=lambda p: (-len(p), p))
+        body = '|'.join(re.escape(p).replace(r'\ ', r'\s+') for p in alternatives)
+        self._pattern = re.compile(rf"(?<!\w)(?:{body})(?!\w)") if body else None
+
+    def scan(self, command):
+        """Every known phrase in command as (phrase, start, end) hits"""
+        if self._pattern is None:
+            self._compile()
+        if self._pattern is None:
+            return []
+        return [(normalize(m.group()), m.start(), m.end())
+                for m in self._pattern.finditer(command)]
+
+    def match(self, command):
+        """Route command to the highest-priority intent, or None"""
+        command = command.lower()
+        hits = self.scan(command)
+        if not hits:
+            return None
+        heard = {hit[0] for hit in hits}
+        for intent in self.intents:
+            if heard.isdisjoint(intent.phrases):
+                continue
+            if intent.requires and heard.isdisjoint(intent.requires):
+                continue
+            return IntentMatch(intent, command, hits)
+        return None
+
+    def dispatch(self, command):
+        """Match command and call its handler; returns (match, result)"""
+        match = self.match(command)
+        if match is None:
+            return None, None
+        return match, match.intent.handler(match)
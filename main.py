@@ -1,25 +1,54 @@
-import speech_recognition as sr
-import pyttsx3
-import subprocess
+import time
+
+# Startup is measured from here; heavy and platform-only modules
+# (speech_recognition, pyautogui, winreg) are imported where they're used
+PROCESS_START = time.perf_counter()
+
+import argparse
 import platform
 import os
+import shutil
+import sys
 import webbrowser
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import pyautogui
-import winreg  # For Windows registry access
 from pathlib import Path
 
+from app_cache import AppCacheStore, dir_mtime
+from app_index import AppIndex
+from app_launcher import Launcher
+from app_scanner import scan_bin_dir, scan_desktop_dir
+from app_usage import UsageStore
+from app_watcher import create_watcher
+from batch_runner import BatchRunner, print_report, read_commands
+from command_context import WorkTracker, current_command, follow_up, run_in_command
+from control_server import ControlServer, default_address
+from intent_router import IntentRouter
+from media_launcher import MediaLauncher, YouTubeResolver
+from process_table import ProcessTable, is_alive, terminate
+from screen_capture import ScreenCapture
+from speech_backends import (ListenTimeout, MicrophoneSource, ServiceUnavailable,
+                             StreamingListener, WavFileSource, create_backend)
+from tracing import Tracer
+from tts import TTSWorker, create_tts_backend
+from wake_word import VoskKeywordSpotter, WakeWordDetector
+
 class UniversalVoiceAssistant:
-    def __init__(self):
-        # Initialize speech recognition
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+    def __init__(self, rebuild_cache=False, legacy_matching=False, watch_apps=False,
+                 speech_backend='google', vosk_model=None, audio_file=None, wake_word=None,
+                 tts_backend='pyttsx3', barge_in=False, tts_cache_dir=None,
+                 media_resolver=None, voice_input=True, cache_path=None,
+                 trace_sample=1.0, trace_file=None, stats_on_exit=False, usage_path=None,
+                 screen_source=None, screenshot_dir=None, screenshot_format='png',
+                 screenshot_quality=85, png_level=3):
+        # Startup phases in seconds, reported with the first listen
+        self.startup_timing = {'imports': time.perf_counter() - PROCESS_START}
         
-        # Initialize text-to-speech
-        self.engine = pyttsx3.init()
-        self.engine.setProperty('rate', 160)
-        self.engine.setProperty('volume', 0.9)
+        # Latency spans around listen/command/handler/speak; trace_sample is
+        # the share of commands recorded, trace_file a JSON-lines export
+        self.tracer = Tracer(trace_sample, trace_file)
+        self.stats_on_exit = stats_on_exit
         
         # Get OS type
         self.os_type = platform.system()
@@ -27,18 +56,323 @@ class UniversalVoiceAssistant:
         # Cache for discovered applications
         self.app_cache = {}
         
+        # On-disk copy of the scan, reused for roots that haven't changed
+        self.cache_store = AppCacheStore(self.os_type, cache_path)
+        self.rebuild_cache = rebuild_cache
+        self.rescanned_sources = 0
+        
+        # Which apps get opened and by what name: answers repeated phrases
+        # directly, ranks frequent apps higher and is loaded before the scan
+        self.usage = UsageStore(usage_path)
+        
+        # Lookup index over app_cache; legacy_matching keeps the old linear
+        # matching rules around so results can be compared
+        self.app_index = AppIndex(self.usage.boosts)
+        self.legacy_matching = legacy_matching
+        
+        # Search roots are scanned on a thread pool and merged into
+        # app_cache/app_index under scan_lock as each one finishes
+        self.scan_lock = threading.Lock()
+        self.scan_done = threading.Event()
+        self.scan_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="app-scan")
+        self._scan_generation = 0
+        self._scan_sources = []
+        
+        # Optional filesystem watcher that keeps app_cache live after the scan
+        self.watch_apps = watch_apps
+        self.watcher = None
+        self._watch_specs = {}
+        
+        # Apps are started without a shell and reaped in the background
+        self.launcher = Launcher()
+        
+        # Processes started by open_application, by app path, so closing them
+        # needs no lookup; anything else is found in the process table
+        self.launched = {}
+        self.launch_lock = threading.Lock()
+        self.processes = ProcessTable()
+        
+        # Screenshots are grabbed on the calling thread and encoded on a
+        # worker; screen_source swaps pyautogui for e.g. a fake framebuffer
+        self.screen_capture = ScreenCapture(screen_source, screenshot_dir, screenshot_format,
+                                            screenshot_quality, png_level, self.tracer)
+        
+        # Slow follow-up steps of actions run on their own threads; shutdown
+        # lets them finish
+        self.background = WorkTracker()
+        
+        # YouTube playback: resolve the video URL directly when possible
+        self.media_launcher = MediaLauncher(media_resolver or YouTubeResolver())
+        
+        # Voice commands are routed through a table of intents; other code
+        # can add its own with self.router.register(...)
+        self.router = IntentRouter()
+        self._register_intents()
+        
+        # Start scanning first so it overlaps with device setup
         print("🔍 Scanning your system for installed applications...")
-        self.scan_system_apps()
-        print(f"✅ Found {len(self.app_cache)} applications!")
+        self.scan_system_apps(wait=False)
+        
+        # Speech input is skipped entirely for scripted (batch) runs. The
+        # recognizer and microphone are set up on a thread of their own while
+        # the scan runs; listen() waits for voice_ready
+        self.recognizer = None
+        self.microphone = None
+        self.listener = None
+        self.wake_detector = None
+        self.voice_ready = threading.Event()
+        self._voice_error = None
+        if voice_input:
+            threading.Thread(target=self._init_voice_input_background, name="voice-init", daemon=True,
+                             args=(speech_backend, vosk_model, audio_file, wake_word)).start()
+        else:
+            self.voice_ready.set()
+        
+        # Initialize text-to-speech on its own worker thread (the engine is
+        # created there too); with barge_in the assistant listens while
+        # talking and a new command cuts it off
+        self.tts = TTSWorker(create_tts_backend(tts_backend, cache_dir=tts_cache_dir), self.tracer)
+        self.barge_in = barge_in
+        
+        # Called with every reply as it is spoken (the control server's
+        # subscribers); exit_requested ends the session from another thread
+        self.reply_hooks = []
+        # TTS ticket of the last reply to a voice command (see speak)
+        self.voice_reply = 0
+        self.control_server = None
+        self.exit_requested = threading.Event()
+        self.startup_timing['constructor'] = time.perf_counter() - PROCESS_START
+        
+    def _init_voice_input_background(self, *args):
+        started = time.perf_counter()
+        try:
+            self._init_voice_input(*args)
+            if self.microphone is not None:
+                # Opening the PyAudio stream is the slow part; do it now
+                self.listener.source.open()
+        except Exception as e:
+            self._voice_error = e
+        finally:
+            self.startup_timing['voice_input'] = time.perf_counter() - started
+            self.voice_ready.set()
+    
+    def wait_for_voice_input(self):
+        """Block until the microphone is ready; re-raises setup errors"""
+        self.voice_ready.wait()
+        if self._voice_error is not None:
+            raise self._voice_error
+    
+    def _init_voice_input(self, speech_backend, vosk_model, audio_file, wake_word):
+        """Initialize speech recognition
         
-    def scan_system_apps(self):
-        """Scan system for all installed applications"""
+        Audio frames go through a VAD into a pluggable backend (Google by
+        default, Vosk for offline streaming).
+        """
+        import speech_recognition as sr
+        self.recognizer = sr.Recognizer()
+        if audio_file:
+            self.microphone = None
+            source = WavFileSource(audio_file, realtime=True)
+        else:
+            self.microphone = sr.Microphone(sample_rate=16000, chunk_size=480)
+            source = MicrophoneSource(self.microphone)
+        try:
+            backend = create_backend(speech_backend, vosk_model, self.recognizer)
+        except ServiceUnavailable as e:
+            print(f"⚠️  {e}; falling back to Google speech recognition")
+            backend = create_backend('google', recognizer=self.recognizer)
+        self.listener = StreamingListener(source, backend)
+        
+        # Optional wake word: only speech that starts with it reaches the recognizer
+        if wake_word:
+            try:
+                spotter = VoskKeywordSpotter(vosk_model, wake_word, source.sample_rate)
+                self.wake_detector = WakeWordDetector(source, spotter, vad=self.listener.vad)
+            except ServiceUnavailable as e:
+                print(f"⚠️  Wake word disabled: {e}")
+            else:
+                # Measure the room now, on silence: left to the first
+                # listen() it would eat the start of the command that
+                # follows the wake word and take the speech as noise
+                self.listener.calibrate()
+    
+    def scan_system_apps(self, rebuild=None, wait=True):
+        """Scan system for all installed applications
+        
+        Each search root becomes one task on scan_executor. With wait=False
+        this returns immediately and app_cache fills in as tasks finish;
+        scan_done is set once everything has been merged.
+        """
+        if rebuild is None:
+            rebuild = self.rebuild_cache
+        if rebuild:
+            self.cache_store.clear()
+        self.rescanned_sources = 0
+        self.scan_done.clear()
+        self._scan_generation += 1
+        
+        # The platform scanners only register sources; nothing is read yet
+        self._scan_sources = []
+        self._watch_specs = {}
         if self.os_type == "Windows":
             self._scan_windows_apps()
         elif self.os_type == "Darwin":
             self._scan_macos_apps()
         else:
             self._scan_linux_apps()
+        
+        self._prewarm()
+        futures = [self.scan_executor.submit(self._run_source, *source)
+                   for source in self._scan_sources]
+        threading.Thread(target=self._finish_scan,
+                         args=(self._scan_generation, futures),
+                         name="app-scan-finish", daemon=True).start()
+        if wait:
+            self.scan_done.wait()
+    
+    def _prewarm(self, count=20):
+        """Make the most used apps findable before any search root is read"""
+        seeds = [(name, path) for name, path in self.usage.top(count) if self._still_installed(path)]
+        with self.scan_lock:
+            for name, path in seeds:
+                if name not in self.app_cache:
+                    self.app_cache[name] = path
+                    self.app_index.add(name, path)
+    
+    @staticmethod
+    def _still_installed(app_path):
+        """Cheap check that a remembered cache value can still be launched"""
+        if app_path.startswith('ms-'):
+            return True  # Windows URI scheme
+        if os.path.isabs(app_path):
+            return os.path.exists(app_path)
+        # Command name or Exec line, resolved through PATH
+        words = app_path.split()
+        return bool(words) and shutil.which(words[0]) is not None
+    
+    def _scan_source(self, source_id, probe, scan):
+        """Register one search root to be scanned
+        
+        probe(key) returns the current stamp value for a key recorded by a
+        previous scan; scan() returns (entries, stamp) for a fresh scan.
+        Sources with probe=None are static and never cached.
+        """
+        self._scan_sources.append((source_id, probe, scan))
+    
+    def _run_source(self, source_id, probe, scan):
+        """Scan one root (or reuse its cached copy) and merge it right away"""
+        entries = None
+        if probe is not None:
+            entries = self.cache_store.lookup(source_id, probe)
+        if entries is None:
+            try:
+                entries, stamp = scan()
+            except (PermissionError, OSError):
+                return None
+            if probe is not None:
+                if stamp:
+                    self.cache_store.put(source_id, stamp, entries)
+                else:
+                    self.cache_store.drop(source_id)
+                with self.scan_lock:
+                    self.rescanned_sources += 1
+        
+        # Make the partial results searchable while other roots are in flight
+        with self.scan_lock:
+            self.app_cache.update(entries)
+            for key, path in entries.items():
+                self.app_index.add(key, path)
+        return source_id, entries
+    
+    def _finish_scan(self, generation, futures):
+        """Rebuild app_cache in source order once every root is done"""
+        results = [future.result() for future in futures]
+        if generation != self._scan_generation:
+            return  # a newer scan has started; let it finish instead
+        
+        # Roots finish in any order, so redo the merge in registration order
+        # to keep "later roots win" deterministic like a sequential scan
+        app_cache = {}
+        seen = set()
+        for result in results:
+            if result is not None:
+                source_id, entries = result
+                seen.add(source_id)
+                app_cache.update(entries)
+        app_index = AppIndex(self.usage.boosts)
+        app_index.build(app_cache)
+        with self.scan_lock:
+            self.app_cache = app_cache
+            self.app_index = app_index
+        
+        self.cache_store.prune(seen)
+        self.cache_store.save()
+        # Watching before scan_done is set, so whoever waits for the scan
+        # sees later changes applied
+        if self.watch_apps:
+            self.start_watcher()
+        self.scan_done.set()
+        print(f"✅ Found {len(self.app_cache)} applications!")
+    
+    def start_watcher(self):
+        """Watch the scanned directories and apply changes as they happen"""
+        self.stop_watcher()
+        if not self._watch_specs:
+            return
+        self.watcher = create_watcher(list(self._watch_specs), self._on_fs_change)
+        self.watcher.start()
+        print(f"👀 Watching {len(self._watch_specs)} folders for new applications")
+    
+    def stop_watcher(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+    
+    def _on_fs_change(self, changes):
+        """Apply a batch of watcher events as single-entry updates"""
+        touched = set()
+        for directory, names in changes.items():
+            spec = self._watch_specs.get(directory)
+            if spec is None:
+                continue
+            source_id, scan, file_entries, file_keys = spec
+            entries = dict(self.cache_store.entries(source_id))
+            if names is None or file_keys is None:
+                # Events were dropped, or single files can't be mapped to
+                # keys; relist just this folder and apply the difference
+                try:
+                    fresh, _ = scan(directory)
+                except (PermissionError, OSError):
+                    fresh = {}
+                touched.update(key for key in entries.keys() | fresh.keys()
+                               if entries.get(key) != fresh.get(key))
+                self.cache_store.put(source_id, {directory: dir_mtime(directory)}, fresh)
+                continue
+            for name in names:
+                for key in file_keys(name):
+                    if entries.pop(key, None) is not None:
+                        touched.add(key)
+                added = file_entries(directory, name)
+                entries.update(added)
+                touched.update(added)
+            self.cache_store.put(source_id, {directory: dir_mtime(directory)}, entries)
+        
+        if not touched:
+            return
+        # A key may also come from another root; later roots win, as in a scan
+        source_ids = [source[0] for source in self._scan_sources]
+        with self.scan_lock:
+            for key in touched:
+                path = None
+                for source_id in source_ids:
+                    path = self.cache_store.entries(source_id).get(key, path)
+                if path is None:
+                    self.app_cache.pop(key, None)
+                    self.app_index.remove(key)
+                else:
+                    self.app_cache[key] = path
+                    self.app_index.add(key, path)
+        self.cache_store.save()
     
     def _scan_windows_apps(self):
         """Scan Windows for installed applications"""
@@ -50,30 +384,21 @@ class UniversalVoiceAssistant:
             os.path.expandvars(r"%APPDATA%"),
         ]
         
-        # Scan directories for .exe files
+        # Scan directories for .exe files, one task per top-level folder so
+        # a huge install root doesn't hold up the rest
         for base_path in search_paths:
-            if os.path.exists(base_path):
-                try:
-                    for root, dirs, files in os.walk(base_path):
-                        # Limit depth to avoid too deep scanning
-                        depth = root[len(base_path):].count(os.sep)
-                        if depth > 3:
-                            continue
-                        
-                        for file in files:
-                            if file.endswith('.exe'):
-                                app_name = file.replace('.exe', '').lower()
-                                app_path = os.path.join(root, file)
-                                
-                                # Store multiple variations of the name
-                                self.app_cache[app_name] = app_path
-                                
-                                # Also store by folder name
-                                folder_name = os.path.basename(root).lower()
-                                if folder_name and folder_name not in self.app_cache:
-                                    self.app_cache[folder_name] = app_path
-                except (PermissionError, OSError):
-                    continue
+            if not os.path.exists(base_path):
+                continue
+            self._scan_source(f"exe:{base_path}", dir_mtime,
+                              lambda base_path=base_path: self._scan_exe_tree(base_path, base_path, 0))
+            try:
+                subdirs = sorted(entry.path for entry in os.scandir(base_path)
+                                 if entry.is_dir(follow_symlinks=False))
+            except (PermissionError, OSError):
+                continue
+            for subdir in subdirs:
+                self._scan_source(f"exe:{subdir}", dir_mtime,
+                                  lambda base_path=base_path, subdir=subdir: self._scan_exe_tree(base_path, subdir))
         
         # Add Windows built-in apps
         builtin_apps = {
@@ -88,7 +413,7 @@ class UniversalVoiceAssistant:
             'control panel': 'control.exe',
             'settings': 'ms-settings:',
         }
-        self.app_cache.update(builtin_apps)
+        self._scan_source("builtin", None, lambda: (builtin_apps, {}))
         
         # Try to get apps from Start Menu registry
         try:
@@ -96,6 +421,35 @@ class UniversalVoiceAssistant:
         except:
             pass
     
+    def _scan_exe_tree(self, base_path, top, max_depth=3):
+        """Walk one subtree of a Windows install root for .exe files"""
+        entries = {}
+        stamp = {}
+        for root, dirs, files in os.walk(top):
+            # Limit depth (relative to the install root) to avoid too deep scanning
+            depth = root[len(base_path):].count(os.sep)
+            if depth >= max_depth:
+                dirs[:] = []
+            
+            # Adding or removing anything we look at changes one of these
+            mtime = dir_mtime(root)
+            if mtime is not None:
+                stamp[root] = mtime
+            
+            for file in files:
+                if file.endswith('.exe'):
+                    app_name = file.replace('.exe', '').lower()
+                    app_path = os.path.join(root, file)
+                    
+                    # Store multiple variations of the name
+                    entries[app_name] = app_path
+                    
+                    # Also store by folder name
+                    folder_name = os.path.basename(root).lower()
+                    if folder_name and folder_name not in entries:
+                        entries[folder_name] = app_path
+        return entries, stamp
+    
     def _scan_windows_registry(self):
         """Scan Windows Registry for installed programs"""
         registry_paths = [
@@ -104,32 +458,52 @@ class UniversalVoiceAssistant:
         ]
         
         for reg_path in registry_paths:
+            self._scan_source(f"reg:{reg_path}", self._registry_mtime,
+                              lambda reg_path=reg_path: self._scan_registry_key(reg_path))
+    
+    def _registry_mtime(self, reg_path):
+        """Last write time of a registry key, or None if it can't be read"""
+        import winreg
+        try:
+            key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path)
+        except OSError:
+            return None
+        try:
+            return winreg.QueryInfoKey(key)[2]
+        finally:
+            winreg.CloseKey(key)
+    
+    def _scan_registry_key(self, reg_path):
+        """Read DisplayName/DisplayIcon pairs under one Uninstall key"""
+        import winreg
+        entries = {}
+        stamp = {}
+        key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path)
+        info = winreg.QueryInfoKey(key)
+        stamp[reg_path] = info[2]
+        for i in range(info[0]):
             try:
-                key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path)
-                for i in range(winreg.QueryInfoKey(key)[0]):
-                    try:
-                        subkey_name = winreg.EnumKey(key, i)
-                        subkey = winreg.OpenKey(key, subkey_name)
-                        
-                        try:
-                            app_name = winreg.QueryValueEx(subkey, "DisplayName")[0]
-                            app_path = winreg.QueryValueEx(subkey, "DisplayIcon")[0]
-                            
-                            if app_name and app_path:
-                                # Clean the path (remove quotes and arguments)
-                                app_path = app_path.split(',')[0].strip('"')
-                                if os.path.exists(app_path):
-                                    self.app_cache[app_name.lower()] = app_path
-                        except:
-                            pass
-                        
-                        winreg.CloseKey(subkey)
-                    except:
-                        continue
+                subkey_name = winreg.EnumKey(key, i)
+                subkey = winreg.OpenKey(key, subkey_name)
                 
-                winreg.CloseKey(key)
+                try:
+                    app_name = winreg.QueryValueEx(subkey, "DisplayName")[0]
+                    app_path = winreg.QueryValueEx(subkey, "DisplayIcon")[0]
+                    
+                    if app_name and app_path:
+                        # Clean the path (remove quotes and arguments)
+                        app_path = app_path.split(',')[0].strip('"')
+                        if os.path.exists(app_path):
+                            entries[app_name.lower()] = app_path
+                except:
+                    pass
+                
+                winreg.CloseKey(subkey)
             except:
                 continue
+        
+        winreg.CloseKey(key)
+        return entries, stamp
     
     def _scan_macos_apps(self):
         """Scan macOS for installed applications"""
@@ -142,14 +516,18 @@ class UniversalVoiceAssistant:
         
         for base_path in search_paths:
             if os.path.exists(base_path):
-                try:
-                    for item in os.listdir(base_path):
-                        if item.endswith('.app'):
-                            app_name = item.replace('.app', '').lower()
-                            app_path = os.path.join(base_path, item)
-                            self.app_cache[app_name] = app_path
-                except (PermissionError, OSError):
-                    continue
+                self._scan_flat_dir(f"app:{base_path}", base_path, None,
+                                    self._app_bundle_entries, self._app_bundle_keys)
+    
+    def _app_bundle_entries(self, base_path, item):
+        """Cache entries contributed by one item in a macOS Applications folder"""
+        if item.endswith('.app'):
+            app_name = item.replace('.app', '').lower()
+            return {app_name: os.path.join(base_path, item)}
+        return {}
+    
+    def _app_bundle_keys(self, item):
+        return {item.replace('.app', '').lower()} if item.endswith('.app') else set()
     
     def _scan_linux_apps(self):
         """Scan Linux for installed applications"""
@@ -158,15 +536,11 @@ class UniversalVoiceAssistant:
         
         for path in search_paths:
             if os.path.exists(path):
-                try:
-                    for file in os.listdir(path):
-                        file_path = os.path.join(path, file)
-                        if os.path.isfile(file_path) and os.access(file_path, os.X_OK):
-                            self.app_cache[file.lower()] = file
-                except (PermissionError, OSError):
-                    continue
+                self._scan_flat_dir(f"bin:{path}", path, scan_bin_dir,
+                                    self._bin_entries, self._bin_keys)
         
-        # Parse .desktop files
+        # Parse .desktop files (names, keywords and the real Exec command);
+        # the watcher rereads the whole folder when one of them changes
         desktop_paths = [
             '/usr/share/applications',
             os.path.expanduser('~/.local/share/applications')
@@ -174,18 +548,98 @@ class UniversalVoiceAssistant:
         
         for desktop_path in desktop_paths:
             if os.path.exists(desktop_path):
-                try:
-                    for file in os.listdir(desktop_path):
-                        if file.endswith('.desktop'):
-                            app_name = file.replace('.desktop', '').lower()
-                            self.app_cache[app_name] = file.replace('.desktop', '')
-                except (PermissionError, OSError):
-                    continue
+                self._scan_flat_dir(f"desktop:{desktop_path}", desktop_path, scan_desktop_dir)
+    
+    def _bin_entries(self, path, file):
+        """Cache entries contributed by one new or changed file in a binary directory"""
+        file_path = os.path.join(path, file)
+        if os.path.isfile(file_path) and os.access(file_path, os.X_OK):
+            return {file.lower(): file}
+        return {}
+    
+    def _bin_keys(self, file):
+        return {file.lower()}
+    
+    def _scan_flat_dir(self, source_id, directory, scan, file_entries=None, file_keys=None):
+        """Register a single-level directory whose files map to cache entries
+        
+        scan(directory) lists the whole folder; if it is None the folder is
+        listed with file_entries. file_entries(directory, name) gives the
+        entries one file contributes right now and file_keys(name) the keys
+        it could have contributed, so the watcher can update single files.
+        Without them the watcher rescans the folder on every change.
+        """
+        if scan is None:
+            def scan(directory):
+                entries = {}
+                stamp = {directory: dir_mtime(directory)}
+                for name in os.listdir(directory):
+                    entries.update(file_entries(directory, name))
+                return entries, stamp
+        
+        self._scan_source(source_id, dir_mtime, lambda: scan(directory))
+        self._watch_specs[directory] = (source_id, scan, file_entries, file_keys)
     
     def find_app(self, app_name):
         """Find application path by name (fuzzy matching)"""
-        app_name = app_name.lower().strip()
+        entry = self.find_app_entry(app_name)
+        return entry[1] if entry else None
+    
+    def find_app_entry(self, app_name):
+        """(matched name, path) for app_name, or None"""
+        with self.tracer.span('find_app') as span:
+            entry = self._find_app(app_name.lower().strip())
+            span.set(found=entry is not None)
+            return entry
+    
+    def _find_app(self, app_name):
+        with self.scan_lock:
+            if app_name in self.app_cache:
+                return app_name, self.app_cache[app_name]
+            # Said this way before: reuse the answer if that app is still there
+            memo = None if self.legacy_matching else self.usage.recall(app_name)
+            if memo is not None:
+                if self.app_cache.get(memo[0]) == memo[1]:
+                    return memo
+                if self.scan_done.is_set():
+                    self.usage.forget(app_name)
+        
+        if not self.scan_done.is_set():
+            # Anything fuzzier could be beaten by a root that is still
+            # being scanned
+            print("⏳ Still scanning applications...")
+            self.scan_done.wait()
         
+        with self.scan_lock:
+            if self.legacy_matching:
+                app_path = self._find_app_legacy(app_name)
+                return (None, app_path) if app_path else None
+            key = self.app_index.best_match(app_name)
+            if key is None:
+                return None
+            return key, self.app_index.keys[key]
+    
+    def _record_usage(self, app_name, entry):
+        """Remember a successful open/close of entry for ranking and recall"""
+        name, path = entry
+        if name is None:
+            return  # legacy matching doesn't know which name matched
+        self.usage.record(app_name.lower().strip(), name, path)
+        self._run_in_background(self.usage.save, 30.0)
+    
+    def find_app_candidates(self, app_name, k=5):
+        """Top-k (name, path, score) matches for app_name, best first"""
+        with self.scan_lock:
+            return self.app_index.search(app_name.lower().strip(), k=k)
+    
+    def _print_candidates(self, app_name):
+        """Show near misses when nothing matched well enough"""
+        candidates = self.find_app_candidates(app_name, k=5)
+        if candidates:
+            print("   Did you mean: " + ", ".join(name for name, _, _ in candidates))
+    
+    def _find_app_legacy(self, app_name):
+        """Original first-hit linear matching, kept for comparison"""
         # Direct match
         if app_name in self.app_cache:
             return self.app_cache[app_name]
@@ -205,65 +659,115 @@ class UniversalVoiceAssistant:
         return None
     
     def speak(self, text):
-        """Convert text to speech"""
-        print(f"🤖 Assistant: {text}")
-        self.engine.say(text)
-        self.engine.runAndWait()
+        """Convert text to speech (queued; returns immediately)"""
+        with self.tracer.span('speak'):
+            print(f"🤖 Assistant: {text}")
+            command = current_command()
+            if command is not None and command.on_reply is not None:
+                command.on_reply(text)
+            for hook in self.reply_hooks:
+                hook(text)
+            if command is None or not command.remote:
+                # The next listen waits for this before opening the mic
+                self.voice_reply = self.tts.say(text)
+            elif command.aloud:
+                # Only into a silent queue, so clients can't hold up the voice loop
+                self.tts.say(text, if_idle=True)
     
     def listen(self):
         """Listen for voice command"""
-        with self.microphone as source:
-            print("\n🎤 Listening...")
-            self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-            try:
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                command = self.recognizer.recognize_google(audio).lower()
-                print(f"👤 You said: {command}")
-                return command
-            except sr.WaitTimeoutError:
-                return ""
-            except sr.UnknownValueError:
-                self.speak("Sorry, I didn't catch that. Could you repeat?")
-                return ""
-            except sr.RequestError:
-                self.speak("Sorry, speech service is unavailable.")
-                return ""
+        with self.tracer.span('listen') as span:
+            command = self._listen()
+            span.set(heard=bool(command))
+            return command
+    
+    def _listen(self):
+        self.wait_for_voice_input()
+        if not self.barge_in:
+            # Don't let the microphone pick up our own voice as a command;
+            # replies to server clients don't count
+            started = time.perf_counter()
+            self.tts.wait(ticket=self.voice_reply)
+            self.listener.discard_pending()
+            self.tracer.record('listen.tts_wait', time.perf_counter() - started)
+        print("\n🎤 Listening...")
+        try:
+            command = self.listener.listen(timeout=5, phrase_time_limit=10,
+                                           stop=self.exit_requested)
+        except ListenTimeout:
+            return ""
+        except ServiceUnavailable:
+            self.speak("Sorry, speech service is unavailable.")
+            return ""
+        
+        # Calibration, waiting for speech, capture and recognition
+        timing = self.listener.last_timing
+        for stage in ('calibrate', 'wait', 'capture', 'decode'):
+            if timing.get(stage):
+                self.tracer.record(f'listen.{stage}', timing[stage])
+        
+        if not command:
+            self.speak("Sorry, I didn't catch that. Could you repeat?")
+            return ""
+        print(f"👤 You said: {command}")
+        if self.barge_in:
+            self.tts.cancel()
+        return command
+    
+    def _report_startup(self):
+        """Print how long it took from process start to the first listen"""
+        timing = self.startup_timing
+        timing['first_listen'] = time.perf_counter() - PROCESS_START
+        parts = [f"imports {timing['imports'] * 1000:.0f} ms",
+                 f"constructor {timing['constructor'] * 1000:.0f} ms"]
+        if 'voice_input' in timing:
+            parts.append(f"voice input {timing['voice_input'] * 1000:.0f} ms")
+        if not self.scan_done.is_set():
+            parts.append("app scan still running")
+        print(f"⏱️  Ready to listen after {timing['first_listen'] * 1000:.0f} ms ({', '.join(parts)})")
     
     def open_application(self, app_name):
         """Open any application"""
-        app_path = self.find_app(app_name)
+        entry = self.find_app_entry(app_name)
         
-        if app_path:
+        if entry:
+            app_path = entry[1]
             try:
-                if self.os_type == "Windows":
-                    # Try different methods
-                    if app_path.startswith('ms-'):
-                        # Windows URI scheme
-                        os.startfile(app_path)
-                    elif os.path.exists(app_path):
-                        os.startfile(app_path)
+                with self.tracer.span('launch') as span:
+                    started = time.perf_counter()
+                    if self.os_type == "Windows":
+                        # Try different methods
+                        if app_path.startswith('ms-') or os.path.exists(app_path):
+                            # Windows URI scheme, or a file the shell knows how to open
+                            os.startfile(app_path)
+                            method = 'startfile'
+                        else:
+                            try:
+                                self._track_launch(app_path, self.launcher.launch(app_path))
+                                method = 'spawn'
+                            except FileNotFoundError:
+                                # Not on PATH; App Paths and file associations
+                                # still resolve it, without going through cmd.exe
+                                os.startfile(app_path)
+                                method = 'startfile'
                     else:
-                        subprocess.Popen(app_path, shell=True)
-                    
-                    self.speak(f"Opening {app_name}")
-                    return True
-                    
-                elif self.os_type == "Darwin":
-                    subprocess.Popen(['open', '-a', app_path])
-                    self.speak(f"Opening {app_name}")
-                    return True
-                    
-                else:  # Linux
-                    subprocess.Popen(app_path, shell=True)
-                    self.speak(f"Opening {app_name}")
-                    return True
-                    
+                        command = ['open', '-a', app_path] if self.os_type == "Darwin" else app_path
+                        # Own session: closing it later signals the whole group
+                        process = self.launcher.launch(command)
+                        self._track_launch(app_path, process)
+                        method = 'posix_spawn' if self.launcher.use_posix_spawn else 'popen'
+                    span.set(method=method)
+                print(f"🚀 Started {app_name} via {method} in {(time.perf_counter() - started) * 1000:.1f} ms")
             except Exception as e:
                 print(f"Error opening {app_name}: {e}")
                 self.speak(f"Sorry, I had trouble opening {app_name}")
                 return False
+            self._record_usage(app_name, entry)
+            self.speak(f"Opening {app_name}")
+            return True
         else:
             self.speak(f"Sorry, I couldn't find {app_name} on your system")
+            self._print_candidates(app_name)
             return False
     
     def open_website(self, site_name):
@@ -290,36 +794,30 @@ class UniversalVoiceAssistant:
     
     def youtube_search(self, query):
         """Search and play on YouTube - opens first video directly"""
-        search_query = query.replace(' ', '+')
-        url = f"https://www.youtube.com/results?search_query={search_query}"
-        webbrowser.open(url)
-        
-        # Wait for page to load then click first video
-        time.sleep(4)
-        try:
-            # Press Tab to focus on first video, then Enter to play it
-            pyautogui.press('tab', presses=3, interval=0.3)
-            pyautogui.press('enter')
-            self.speak(f"Playing {query} on YouTube")
-        except:
-            self.speak(f"Opened search results for {query}")
+        self._play_media(query, f"Opened search results for {query}")
     
     def play_song_youtube(self, song_name):
         """Play a specific song on YouTube - opens the first video directly"""
-        search_query = song_name.replace(' ', '+')
-        # Use YouTube search that auto-plays first result
-        url = f"https://www.youtube.com/results?search_query={search_query}"
-        webbrowser.open(url)
+        self._play_media(song_name, f"Opened search results for {song_name}. Please click the video you want.")
+    
+    def _play_media(self, query, fallback_message):
+        """Start the first video for query without holding up the main loop"""
+        def play():
+            if self.media_launcher.play(query) == 'search':
+                self.speak(fallback_message)
+            else:
+                self.speak(f"Playing {query} on YouTube")
+        self._run_in_background(play)
+    
+    def _run_in_background(self, target, *args):
+        """Run a slow follow-up step of an action off the main loop
         
-        # Wait for page to load then click first video
-        time.sleep(4)
-        try:
-            # Press Tab to focus on first video, then Enter to play it
-            pyautogui.press('tab', presses=3, interval=0.3)
-            pyautogui.press('enter')
-            self.speak(f"Playing {song_name} on YouTube")
-        except:
-            self.speak(f"Opened search results for {song_name}. Please click the video you want.")
+        The step still counts as part of the current command (batch runs
+        wait for it) and shutdown() waits for it too.
+        """
+        thread = threading.Thread(target=follow_up(target, self.background), args=args, daemon=True)
+        thread.start()
+        return thread
     
     def google_search(self, query):
         """Search on Google"""
@@ -339,31 +837,71 @@ class UniversalVoiceAssistant:
         day = datetime.now().strftime("%A")
         self.speak(f"Today is {day}, {current_date}")
     
+    def _track_launch(self, app_path, process):
+        """Remember a process we started; forgets earlier ones that exited"""
+        with self.launch_lock:
+            for path in list(self.launched):
+                running = [p for p in self.launched[path] if p.poll() is None]
+                if running:
+                    self.launched[path] = running
+                else:
+                    del self.launched[path]
+            self.launched.setdefault(app_path, []).append(process)
+    
+    def _running_launches(self, app_path):
+        with self.launch_lock:
+            running = [p for p in self.launched.get(app_path, ()) if p.poll() is None]
+            if running:
+                self.launched[app_path] = running
+            else:
+                self.launched.pop(app_path, None)
+            return running
+    
     def close_application(self, app_name):
-        """Close an application"""
+        """Close an application
+        
+        Processes we launched are signalled directly; otherwise the exact
+        matching processes are looked up. Each gets SIGTERM (WM_CLOSE on
+        Windows) and, if it is still running a few seconds later, SIGKILL
+        (TerminateProcess) in the background.
+        """
+        entry = self.find_app_entry(app_name)
+        if entry is None:
+            self.speak(f"Could not find {app_name} to close")
+            return
+        app_path = entry[1]
         try:
-            if self.os_type == "Windows":
-                # Try to find the process name
-                app_path = self.find_app(app_name)
-                if app_path:
-                    process_name = os.path.basename(app_path)
-                    subprocess.run(f"taskkill /f /im {process_name}", shell=True)
-                    self.speak(f"Closing {app_name}")
+            with self.tracer.span('close') as span:
+                launched = self._running_launches(app_path)
+                if launched:
+                    span.set(source='launched')
+                    by_pid = {p.pid: p for p in launched}
+                    pids = list(by_pid)
+                    # Our own children lead their own process group (not on Windows)
+                    groups = set(pids) if self.os_type != "Windows" else ()
+                    self._run_in_background(terminate, pids, 3.0, groups,
+                                            lambda pid: by_pid[pid].poll() is None)
                 else:
-                    self.speak(f"Could not find {app_name} to close")
-            elif self.os_type == "Darwin":
-                subprocess.run(f"pkill -x '{app_name}'", shell=True)
-                self.speak(f"Closing {app_name}")
-            else:
-                subprocess.run(f"pkill {app_name}", shell=True)
-                self.speak(f"Closing {app_name}")
+                    span.set(source='process_table')
+                    pids = self.processes.find(app_path)
+                    if pids:
+                        self._run_in_background(terminate, pids, 3.0, (), is_alive)
         except Exception as e:
             self.speak(f"Could not close {app_name}")
             print(f"Error: {e}")
+            return
+        
+        if pids == []:
+            self.speak(f"{app_name} doesn't seem to be running")
+            return
+        self._record_usage(app_name, entry)
+        self.speak(f"Closing {app_name}")
     
     def volume_control(self, action):
         """Control system volume"""
         try:
+            # pyautogui pulls in the screenshot/X11 stack; load it on first use
+            import pyautogui
             if action == "up" or action == "increase":
                 pyautogui.press("volumeup", presses=5)
                 self.speak("Volume increased")
@@ -376,134 +914,371 @@ class UniversalVoiceAssistant:
         except:
             self.speak("Could not control volume")
     
-    def take_screenshot(self):
-        """Take a screenshot"""
+    def take_screenshot(self, region=None, count=1, interval=1.0):
+        """Take a screenshot (or count of them, interval seconds apart)
+        
+        Only the grab happens here; encoding and saving run on the capture
+        worker, and the reply is spoken once the file is on disk.
+        """
+        capture = self.screen_capture
+        
+        def saved(path):
+            if path is None:
+                self.speak("Could not take screenshot")
+            else:
+                self.speak(f"Screenshot saved as {os.path.basename(path)}")
+        
+        def saved_all(paths):
+            if not paths:
+                self.speak("Could not take screenshots")
+            else:
+                self.speak(f"Saved {len(paths)} screenshots, the last one as {os.path.basename(paths[-1])}")
+        
         try:
-            screenshot = pyautogui.screenshot()
-            filename = f"screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            screenshot.save(filename)
-            self.speak(f"Screenshot saved as {filename}")
-        except:
+            if region is not None:
+                region = capture.region(region)
+            if count > 1:
+                self.speak(f"Taking {count} screenshots")
+                capture.capture_repeated(count, interval, region,
+                                         on_done=follow_up(saved_all, self.background))
+                return
+        except Exception:
             self.speak("Could not take screenshot")
+            return
+        # The reply comes from the encoder thread but belongs to this command
+        on_saved = follow_up(saved, self.background)
+        try:
+            capture.capture(region, on_saved=on_saved)
+        except Exception:
+            on_saved(None)
     
-    def list_apps(self):
-        """List some available applications"""
-        apps = list(self.app_cache.keys())[:20]  # First 20 apps
+    def list_apps(self, query=None):
+        """List some available applications, or the closest matches to query"""
+        if query:
+            candidates = self.find_app_candidates(query, k=10)
+            if candidates:
+                print(f"\n📱 Closest matches for '{query}':")
+                for name, path, score in candidates:
+                    print(f"   • {name} ({score:.2f}) -> {path}")
+                self.speak(f"The closest match for {query} is {candidates[0][0]}")
+            else:
+                self.speak(f"I couldn't find anything like {query}")
+            return
+        
+        with self.scan_lock:
+            apps = list(self.app_cache.keys())[:20]  # First 20 apps
         print("\n📱 Some available applications:")
         for app in apps:
             print(f"   • {app}")
         self.speak(f"I found {len(self.app_cache)} applications. Check the console for a list.")
     
-    def process_command(self, command):
-        """Process voice command"""
-        if not command:
-            return True
-        
+    def _register_intents(self):
+        """Build the command table; registration order is priority order"""
+        router = self.router
         # Exit commands
-        if any(word in command for word in ['exit', 'quit', 'bye', 'goodbye', 'stop']):
-            self.speak("Goodbye! Have a great day!")
-            return False
-        
-        # List available apps
-        elif 'list apps' in command or 'show apps' in command or 'what apps' in command:
-            self.list_apps()
-        
+        router.register('exit', ['exit', 'quit', 'bye', 'goodbye', 'stop'], self._on_exit)
+        # List available apps ("list apps like code" shows the nearest matches)
+        router.register('list_apps', ['list apps', 'show apps', 'what apps'], self._on_list_apps,
+                        keywords=['like'])
         # Open applications or websites
-        elif 'open' in command:
-            # Remove 'open' and get the app name
-            app_name = command.replace('open', '').strip()
-            
-            # Check if it's a common website
-            common_sites = ['youtube', 'google', 'gmail', 'facebook', 'instagram', 
-                          'twitter', 'linkedin', 'github', 'reddit', 'amazon', 'netflix']
-            
-            if any(site in app_name for site in common_sites):
-                for site in common_sites:
-                    if site in app_name:
-                        self.open_website(site)
-                        return True
-            
-            # Try to open as application
-            if app_name:
-                self.open_application(app_name)
-            else:
-                self.speak("Please specify what to open")
-        
+        router.register('open', ['open'], self._on_open)
         # YouTube song/video search
-        elif ('play' in command or 'search' in command) and 'youtube' in command:
-            query = command.replace('play', '').replace('search', '').replace('on youtube', '').replace('youtube', '').replace('song', '').strip()
-            if query:
-                self.play_song_youtube(query)
-            else:
-                self.speak("What would you like me to play on YouTube?")
-        
+        router.register('youtube', ['youtube', 'on youtube'], self._on_youtube, requires=['play', 'search'],
+                        strip=['play', 'search', 'on youtube', 'youtube', 'song'])
         # Direct song play command
-        elif 'play' in command and ('song' in command or 'music' in command):
-            query = command.replace('play', '').replace('song', '').replace('music', '').strip()
-            if query:
-                self.play_song_youtube(query)
-            else:
-                self.speak("Which song would you like me to play?")
-        
+        router.register('play_song', ['play'], self._on_play_song, requires=['song', 'music'])
         # Google search
-        elif 'search' in command or 'google' in command:
-            query = command.replace('search', '').replace('google', '').replace('for', '').strip()
-            if query:
-                self.google_search(query)
-            else:
-                self.speak("What would you like me to search for?")
-        
+        router.register('search', ['search', 'google'], self._on_search)
         # Close applications
-        elif 'close' in command:
-            app_name = command.replace('close', '').strip()
-            if app_name:
-                self.close_application(app_name)
-            else:
-                self.speak("Please specify which application to close")
-        
+        router.register('close', ['close'], self._on_close)
         # Volume control
-        elif 'volume' in command:
-            if 'up' in command or 'increase' in command:
-                self.volume_control("up")
-            elif 'down' in command or 'decrease' in command:
-                self.volume_control("down")
-            elif 'mute' in command:
-                self.volume_control("mute")
-        
+        router.register('volume', ['volume'], self._on_volume,
+                        keywords=['up', 'increase', 'down', 'decrease', 'mute'])
         # Screenshot
-        elif 'screenshot' in command or 'capture screen' in command:
-            self.take_screenshot()
-        
+        # ("screenshot of the left half", "take 3 screenshots every 5 seconds")
+        router.register('screenshot', ['screenshot', 'screenshots', 'capture screen'], self._on_screenshot,
+                        keywords=['left', 'right', 'top', 'bottom', 'every'])
         # Time
-        elif 'time' in command:
-            self.get_time()
-        
+        router.register('time', ['time'], lambda match: self.get_time())
         # Date
-        elif 'date' in command or 'today' in command:
-            self.get_date()
-        
+        router.register('date', ['date', 'today'], lambda match: self.get_date())
+        # Latency statistics
+        router.register('stats', ['stats', 'statistics', 'latency'], self._on_stats)
         # Help
-        elif 'help' in command or 'what can you do' in command:
-            self.speak("I can open ANY application on your computer! "
-                      "Just say 'open' followed by the app name. "
-                      "I can also play songs on YouTube, search Google, control volume, "
-                      "take screenshots, and much more. Say 'list apps' to see available applications.")
+        router.register('help', ['help', 'what can you do'], self._on_help)
+    
+    def process_command(self, command, context=None):
+        """Process voice command
         
-        else:
-            self.speak("I'm not sure how to help with that. Say 'help' for available commands.")
+        With a command_context.CommandContext, follow-up work the handler
+        starts in the background is counted against it, so the caller can
+        wait for the whole action.
+        """
+        if context is not None:
+            return run_in_command(context, self.process_command, command)
+        if not command:
+            return True
+        
+        with self.tracer.span('command') as span:
+            match = self.router.match(command)
+            if match is None:
+                span.set(intent=None)
+                self.speak("I'm not sure how to help with that. Say 'help' for available commands.")
+                return True
+            span.set(intent=match.intent.name)
+            with self.tracer.span(f'handler.{match.intent.name}'):
+                result = match.intent.handler(match)
+        # Handlers return False only to end the session
+        return result is not False
+    
+    def _on_exit(self, match):
+        self.speak("Goodbye! Have a great day!")
+        return False
+    
+    def _on_list_apps(self, match):
+        self.list_apps(match.after('like') or None)
+    
+    def _on_open(self, match):
+        app_name = match.slot()
+        
+        # Check if it's a common website
+        common_sites = ['youtube', 'google', 'gmail', 'facebook', 'instagram', 
+                      'twitter', 'linkedin', 'github', 'reddit', 'amazon', 'netflix']
+        
+        words = app_name.split()
+        for site in common_sites:
+            if site in words:
+                self.open_website(site)
+                return
         
-        return True
+        # Try to open as application
+        if app_name:
+            self.open_application(app_name)
+        else:
+            self.speak("Please specify what to open")
+    
+    def _on_youtube(self, match):
+        query = match.slot()
+        if query:
+            self.play_song_youtube(query)
+        else:
+            self.speak("What would you like me to play on YouTube?")
+    
+    def _on_play_song(self, match):
+        query = match.slot()
+        if query:
+            self.play_song_youtube(query)
+        else:
+            self.speak("Which song would you like me to play?")
+    
+    def _on_search(self, match):
+        query = match.slot(fillers=('for',))
+        if query:
+            self.google_search(query)
+        else:
+            self.speak("What would you like me to search for?")
+    
+    def _on_close(self, match):
+        app_name = match.slot()
+        if app_name:
+            self.close_application(app_name)
+        else:
+            self.speak("Please specify which application to close")
+    
+    def _on_volume(self, match):
+        if match.has('up', 'increase'):
+            self.volume_control("up")
+        elif match.has('down', 'decrease'):
+            self.volume_control("down")
+        elif match.has('mute'):
+            self.volume_control("mute")
+    
+    def _on_screenshot(self, match):
+        region = None
+        for side in ('left', 'right', 'top', 'bottom'):
+            if match.has(side):
+                region = side
+                break
+        # "take 3 screenshots": the number right before the plural
+        count = 1
+        words = match.command.split()
+        if 'screenshots' in words:
+            position = words.index('screenshots')
+            if position:
+                count = min(self._spoken_number(words[position - 1]) or 1, 20)
+        interval = 1.0
+        seconds = match.after('every').split()
+        if seconds:
+            interval = float(self._spoken_number(seconds[0]) or 1)
+        self.take_screenshot(region, count, interval)
+    
+    @staticmethod
+    def _spoken_number(word):
+        """'5' or 'five' -> 5; None for anything else"""
+        if word.isdigit():
+            return int(word)
+        return {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+                'eight': 8, 'nine': 9, 'ten': 10}.get(word)
+    
+    def _on_stats(self, match):
+        self.print_stats()
+        command = self.tracer.snapshot().get('command')
+        if command is None:
+            self.speak("I haven't timed any commands yet.")
+            return
+        message = f"Commands take {command['p90_ms']:.0f} milliseconds or less nine times out of ten."
+        slowest = self.tracer.slowest(exclude=('command', 'listen', 'listen.wait', 'tts.say', 'handler.stats'))
+        if slowest:
+            message += f" The slowest step is {slowest[0]}."
+        self.speak(message)
+    
+    def print_stats(self):
+        """Per-stage latency table from the tracer"""
+        print(f"\n⏱️  Latency by stage (sampling {self.tracer.sample_rate:.0%} of commands):")
+        for line in self.tracer.report():
+            print(line)
+    
+    def _on_help(self, match):
+        self.speak("I can open ANY application on your computer! "
+                  "Just say 'open' followed by the app name. "
+                  "I can also play songs on YouTube, search Google, control volume, "
+                  "take screenshots, and much more. Say 'list apps' to see available applications.")
     
     def run(self):
         """Main loop"""
         self.speak("Hello, how can I help you?")
+        self.wait_for_voice_input()
+        self._report_startup()
         
         while True:
-            command = self.listen()
-            if not self.process_command(command):
+            try:
+                if self.wake_detector is not None:
+                    # A server client can end the session while we wait
+                    if not self.wake_detector.wait(stop=self.exit_requested):
+                        break
+                    print(f"👂 Wake word heard ({self.wake_detector.report()})")
+                command = self.listen()
+            except EOFError:
+                break  # the audio file has been played through
+            if not self.process_command(command) or self.exit_requested.is_set():
                 break
+        
+        self.shutdown()
+    
+    def start_server(self, address=None):
+        """Accept text commands from local programs (see control_server.py)"""
+        self.control_server = ControlServer(self, address)
+        self.control_server.start()
+        print(f"🔌 Control server listening on {self.control_server.address}")
+        if self.control_server.token_path:
+            print(f"🔑 Clients authenticate with the token in {self.control_server.token_path}")
+    
+    def serve_forever(self):
+        """Only take commands from the control server, until one says exit (or Ctrl+C)"""
+        try:
+            # Short waits so Ctrl+C gets through on every platform
+            while not self.exit_requested.wait(1):
+                pass
+        finally:
+            self.shutdown()
+    
+    def run_batch(self, stream, max_workers=4):
+        """Run newline-delimited commands from a file or stdin instead of the microphone"""
+        started = time.perf_counter()
+        results = BatchRunner(self, max_workers).run(read_commands(stream))
+        print_report(results, time.perf_counter() - started)
+        self.shutdown()
+        return results
+    
+    def shutdown(self):
+        """Let the last replies finish before the process exits"""
+        if not self.background.wait(10):
+            print("⚠️  Some actions were still running at exit")
+        if self.control_server is not None:
+            self.control_server.stop()
+        self.screen_capture.close()
+        self.tts.close()
+        cache = getattr(self.tts.backend, 'cache', None)
+        if cache is not None:
+            stats = cache.stats()
+            print(f"🔊 Phrase cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"~{stats['saved_seconds']:.1f}s of rendering saved")
+        self.usage.save()
+        if self.stats_on_exit:
+            self.print_stats()
+        self.tracer.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Universal voice assistant")
+    parser.add_argument('--rescan', action='store_true',
+                        help="ignore the saved app cache and rescan every search root")
+    parser.add_argument('--legacy-matching', action='store_true',
+                        help="use the old first-hit app name matching instead of the index")
+    parser.add_argument('--watch', action='store_true',
+                        help="watch application folders and pick up installs/removals live")
+    parser.add_argument('--speech-backend', choices=['google', 'vosk'], default='google',
+                        help="speech recognizer: google (online) or vosk (offline, streaming)")
+    parser.add_argument('--vosk-model', metavar='DIR',
+                        help="path to a Vosk model folder for --speech-backend vosk")
+    parser.add_argument('--audio-file', metavar='WAV',
+                        help="read commands from a 16-bit WAV file instead of the microphone")
+    parser.add_argument('--wake-word', metavar='PHRASE',
+                        help="only listen for commands after this phrase (needs --vosk-model)")
+    parser.add_argument('--tts', choices=['pyttsx3', 'cached', 'null'], default='pyttsx3',
+                        help="speech output; 'cached' replays phrases it has said before, "
+                             "'null' only prints replies (headless runs)")
+    parser.add_argument('--tts-cache-dir', metavar='DIR',
+                        help="keep rendered phrases for --tts cached on disk between runs")
+    parser.add_argument('--barge-in', action='store_true',
+                        help="keep listening while speaking and stop talking when a new command arrives "
+                             "(use with a headset so the assistant doesn't hear itself)")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="run newline-delimited commands from FILE ('-' for stdin) instead of listening")
+    parser.add_argument('--batch-workers', type=int, default=4, metavar='N',
+                        help="how many launches --batch may run at once")
+    parser.add_argument('--trace-sample', type=float, default=1.0, metavar='RATE',
+                        help="share of commands whose latency is recorded, 0 to 1 (default 1)")
+    parser.add_argument('--trace-file', metavar='JSONL',
+                        help="append every recorded span to this JSON-lines file")
+    parser.add_argument('--stats', action='store_true',
+                        help="print per-stage latency statistics on exit")
+    parser.add_argument('--screenshot-format', choices=['png', 'webp', 'jpeg'], default='png',
+                        help="file format for screenshots (webp/jpeg need Pillow)")
+    parser.add_argument('--screenshot-quality', type=int, default=85, metavar='Q',
+                        help="webp/jpeg quality, 1 to 100 (default 85)")
+    parser.add_argument('--png-level', type=int, default=3, choices=range(10), metavar='0-9',
+                        help="PNG compression level; higher is smaller but slower (default 3)")
+    parser.add_argument('--screenshot-dir', metavar='DIR',
+                        help="save screenshots here instead of the current folder")
+    parser.add_argument('--serve', nargs='?', const=default_address(), metavar='ADDRESS',
+                        help="accept JSON-lines commands from local programs on a Unix socket path "
+                             f"or host:port (default {default_address()})")
+    parser.add_argument('--no-voice', action='store_true',
+                        help="with --serve: don't use the microphone, only take commands from the server")
+    args = parser.parse_args()
+    if args.no_voice and not args.serve:
+        parser.error("--no-voice needs --serve")
+    
+    if args.batch:
+        assistant = UniversalVoiceAssistant(rebuild_cache=args.rescan,
+                                            legacy_matching=args.legacy_matching,
+                                            tts_backend=args.tts,
+                                            tts_cache_dir=args.tts_cache_dir,
+                                            voice_input=False,
+                                            trace_sample=args.trace_sample,
+                                            trace_file=args.trace_file,
+                                            stats_on_exit=args.stats,
+                                            screenshot_dir=args.screenshot_dir,
+                                            screenshot_format=args.screenshot_format,
+                                            screenshot_quality=args.screenshot_quality,
+                                            png_level=args.png_level)
+        if args.batch == '-':
+            assistant.run_batch(sys.stdin, args.batch_workers)
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                assistant.run_batch(f, args.batch_workers)
+        sys.exit(0)
+    
     print("=" * 70)
     print("   🎙️  UNIVERSAL VOICE ASSISTANT - ALL APPS ACCESS  🎙️")
     print("=" * 70)
@@ -523,17 +1298,43 @@ if __name__ == "__main__":
     print("   • 'search [anything]' or 'google [query]'")
     print("\n  SYSTEM:")
     print("   • 'volume up/down/mute'")
-    print("   • 'take screenshot'")
+    print("   • 'take screenshot', 'screenshot of the left half'")
+    print("   • 'take 3 screenshots every 5 seconds'")
     print("   • 'close [app name]'")
     print("   • 'what's the time/date'")
+    print("   • 'stats' - Where the time goes (latency per stage)")
+    print("\n REMOTE CONTROL:")
+    print("   • python main.py --serve  - scripts can send commands as JSON lines")
     print("\n EXIT:")
     print("   • 'exit' or 'quit' or 'goodbye'")
     print("\n" + "=" * 70)
     print(" Starting assistant...\n")
     
     try:
-        assistant = UniversalVoiceAssistant()
-        assistant.run()
+        assistant = UniversalVoiceAssistant(rebuild_cache=args.rescan,
+                                            legacy_matching=args.legacy_matching,
+                                            watch_apps=args.watch,
+                                            speech_backend=args.speech_backend,
+                                            vosk_model=args.vosk_model,
+                                            audio_file=args.audio_file,
+                                            wake_word=args.wake_word,
+                                            tts_backend=args.tts,
+                                            barge_in=args.barge_in,
+                                            tts_cache_dir=args.tts_cache_dir,
+                                            trace_sample=args.trace_sample,
+                                            trace_file=args.trace_file,
+                                            stats_on_exit=args.stats,
+                                            screenshot_dir=args.screenshot_dir,
+                                            screenshot_format=args.screenshot_format,
+                                            screenshot_quality=args.screenshot_quality,
+                                            png_level=args.png_level,
+                                            voice_input=not args.no_voice)
+        if args.serve:
+            assistant.start_server(args.serve)
+        if args.no_voice:
+            assistant.serve_forever()
+        else:
+            assistant.run()
     except KeyboardInterrupt:
         print("\n\n❌ Assistant stopped by user.")
     except Exception as e:
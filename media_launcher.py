@@ -0,0 +1,145 @@
+import re
+import shutil
+import subprocess
+import sys
+import time
+import urllib.parse
+import webbrowser
+
+YOUTUBE_SEARCH_URL = "https://www.youtube.com/results?search_query={}"
+YOUTUBE_WATCH_URL = "https://www.youtube.com/watch?v={}"
+VIDEO_ID_PATTERN = re.compile(r'"videoId":"([A-Za-z0-9_-]{11})"')
+
+
+def youtube_search_url(query):
+    return YOUTUBE_SEARCH_URL.format(urllib.parse.quote_plus(query))
+
+
+class YouTubeResolver:
+    """Finds the first video for a query by reading the results page
+
+    One HTTP request instead of loading the page in the browser and tabbing
+    to the first result. Returns None on any network or parsing problem so
+    the launcher can fall back.
+    """
+
+    def __init__(self, timeout=3.0):
+        self.timeout = timeout
+
+    def resolve(self, query):
+        # http.client and friends are only needed once something is played
+        import urllib.request
+        request = urllib.request.Request(youtube_search_url(query), headers={
+            'User-Agent': 'Mozilla/5.0',
+            'Accept-Language': 'en-US,en;q=0.8',
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                page = response.read().decode('utf-8', errors='replace')
+        except (OSError, ValueError):
+            return None
+        match = VIDEO_ID_PATTERN.search(page)
+        if match is None:
+            return None
+        return YOUTUBE_WATCH_URL.format(match.group(1))
+
+
+class StubResolver:
+    """Resolver with canned answers, for tests and offline runs"""
+
+    def __init__(self, urls=None):
+        self.urls = dict(urls or {})
+        self.queries = []
+
+    def resolve(self, query):
+        self.queries.append(query)
+        return self.urls.get(query)
+
+
+def active_window_title():
+    """Title of the focused window, or None if this platform can't tell us"""
+    try:
+        if sys.platform == 'win32':
+            import pyautogui
+            return pyautogui.getActiveWindowTitle() or ''
+        if sys.platform == 'darwin':
+            script = ('tell application "System Events" to get name of first window of '
+                      '(first application process whose frontmost is true)')
+            result = subprocess.run(['osascript', '-e', script], capture_output=True,
+                                    text=True, timeout=1)
+            return result.stdout.strip() if result.returncode == 0 else ''
+        if shutil.which('xdotool'):
+            result = subprocess.run(['xdotool', 'getactivewindow', 'getwindowname'],
+                                    capture_output=True, text=True, timeout=1)
+            return result.stdout.strip() if result.returncode == 0 else ''
+    except (ImportError, AttributeError, OSError, subprocess.SubprocessError):
+        pass
+    return None
+
+
+def wait_until(predicate, timeout, interval=0.25):
+    """Poll predicate until it is true; returns False on timeout"""
+    deadline = time.monotonic() + timeout
+    while True:
+        if predicate():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+class MediaLauncher:
+    """Opens the first YouTube video for a spoken query
+
+    Tries the resolver first and opens the video URL directly. Otherwise it
+    opens the search results, polls the focused window title until it has
+    changed to the results page (up to ready_timeout) and tabs to the first
+    video. Where the title can't be read it leaves the results page for the
+    user rather than pressing keys blind.
+    """
+
+    def __init__(self, resolver=None, open_url=webbrowser.open, window_title=active_window_title,
+                 ready_timeout=10.0, settle=0.5):
+        self.resolver = resolver
+        self.open_url = open_url
+        self.window_title = window_title
+        self.ready_timeout = ready_timeout
+        self.settle = settle
+
+    def play(self, query):
+        """Start the first video for query
+
+        Returns 'direct' if a video URL was opened, 'clicked' if the first
+        search result was selected, or 'search' if only the results page
+        could be shown.
+        """
+        url = self.resolver.resolve(query) if self.resolver is not None else None
+        if url:
+            self.open_url(url)
+            return 'direct'
+
+        # A YouTube tab may already be in front; only a new title means the
+        # results page has replaced it
+        before = self.window_title()
+        self.open_url(youtube_search_url(query))
+        if before is None or not self._wait_for_results(before):
+            return 'search'
+        try:
+            import pyautogui
+            # Press Tab to focus on first video, then Enter to play it
+            pyautogui.press('tab', presses=3, interval=0.3)
+            pyautogui.press('enter')
+        except Exception:
+            return 'search'
+        return 'clicked'
+
+    def _wait_for_results(self, before):
+        """Wait for a YouTube window titled other than before; False on timeout"""
+        def changed():
+            title = self.window_title() or ''
+            return title != before and 'youtube' in title.lower()
+        ready = wait_until(changed, self.ready_timeout)
+        if ready:
+            # The title switches before the results are laid out
+            time.sleep(self.settle)
+        return ready
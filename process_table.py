@@ -0,0 +1,441 @@
+import os
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+# Linux truncates the process name in /proc/<pid>/comm to this many bytes
+COMM_LENGTH = 15
+
+
+class ProcessInfo:
+    """What /proc says about one process"""
+
+    __slots__ = ('pid', 'start', 'name', 'exe', 'argv')
+
+    def __init__(self, pid, start, name, exe, argv):
+        self.pid = pid
+        self.start = start
+        self.name = name
+        self.exe = exe
+        self.argv = argv
+
+
+def _read_stat(proc, pid):
+    """(state, start time) from /proc/<pid>/stat, or None if it's gone"""
+    try:
+        with open(f"{proc}/{pid}/stat", 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The name field can contain spaces and parentheses; fields restart
+    # after the last ')'
+    fields = data[data.rfind(b')') + 2:].split()
+    try:
+        return fields[0], int(fields[19])
+    except (IndexError, ValueError):
+        return None
+
+
+def _read_process(proc, pid):
+    stat = _read_stat(proc, pid)
+    if stat is None or stat[0] == b'Z':
+        return None
+    try:
+        with open(f"{proc}/{pid}/comm", 'rb') as f:
+            name = f.read().decode('utf-8', 'replace').strip()
+        with open(f"{proc}/{pid}/cmdline", 'rb') as f:
+            argv = [arg.decode('utf-8', 'replace') for arg in f.read().split(b'\0') if arg]
+    except OSError:
+        return None
+    try:
+        exe = os.readlink(f"{proc}/{pid}/exe")
+        if exe.endswith(' (deleted)'):
+            exe = exe[:-len(' (deleted)')]  # upgraded while running
+    except OSError:
+        exe = None  # kernel thread, or exited meanwhile
+    return ProcessInfo(pid, stat[1], name, exe, argv)
+
+
+# Programs that run the program named in their arguments. A process
+# running one of these is matched by that argument, never by its own name,
+# so closing a script doesn't take every python3 (or sh) with it.
+WRAPPERS = {'env', 'nohup', 'nice', 'ionice', 'setsid', 'stdbuf', 'exec', 'flatpak', 'snap'}
+SHELLS = {'sh', 'bash', 'dash', 'zsh', 'ksh', 'fish'}
+# Interpreter -> (options that take a value, options whose value is inline
+# code, options whose value names the program)
+INTERPRETERS = {
+    'python': ({'-W', '-X', '-Q'}, {'-c'}, {'-m'}),
+    'pypy': ({'-W', '-X'}, {'-c'}, {'-m'}),
+    'perl': ({'-I', '-M', '-m'}, {'-e', '-E'}, set()),
+    'ruby': ({'-I', '-r'}, {'-e'}, set()),
+    'node': ({'-r', '--require'}, {'-e', '--eval', '-p', '--print'}, set()),
+    'nodejs': ({'-r', '--require'}, {'-e', '--eval', '-p', '--print'}, set()),
+    'java': ({'-cp', '-classpath', '--class-path', '-p', '--module-path'}, set(),
+             {'-jar', '-m', '--module'}),
+    'lua': ({'-l'}, {'-e'}, set()),
+    'php': ({'-c', '-d'}, {'-r'}, {'-f'}),
+    'gjs': ({'-I', '--include-path'}, {'-c', '--command'}, set()),
+    'mono': (set(), set(), set()),
+    'dotnet': (set(), set(), set()),
+}
+# How many wrappers deep an Exec line is unwrapped
+MAX_UNWRAP = 5
+
+
+def _split(command):
+    if os.sep != '/':
+        return command.split()  # shlex would eat the backslashes in Windows paths
+    try:
+        return shlex.split(command)
+    except ValueError:
+        return command.split()
+
+
+def _runner(word):
+    """'wrapper', 'shell' or an INTERPRETERS key if word runs another program"""
+    name = os.path.basename(word).lower()
+    if name.endswith('.exe'):
+        name = name[:-len('.exe')]
+    if name in WRAPPERS:
+        return 'wrapper'
+    if name in SHELLS:
+        return 'shell'
+    # python3, python3.11, lua5.4, ...
+    name = re.sub(r'[\d.]+$', '', name)
+    return name if name in INTERPRETERS else None
+
+
+def _program(argv, depth=0):
+    """The word in argv naming the program it really runs, or None
+
+    Wrappers and interpreters are looked through: 'env A=1 python3 -u
+    /x/foo.py' runs /x/foo.py, 'sh -c "foo --bar"' runs foo, 'flatpak run
+    org.foo.App' runs org.foo.App, 'java -jar foo.jar' runs foo.jar. A bare
+    interpreter runs itself; inline code ('python3 -c ...') is None, since
+    nothing names it.
+    """
+    if not argv or depth > MAX_UNWRAP:
+        return None
+    kind = _runner(argv[0])
+    if kind is None:
+        return argv[0]
+    args = argv[1:]
+    if kind == 'wrapper':
+        name = os.path.basename(argv[0]).lower()
+        if name in ('flatpak', 'snap'):
+            # flatpak run [--options] APP-ID, snap run [--options] NAME
+            if not args or args[0] != 'run':
+                return None
+            words = [arg for arg in args[1:] if not arg.startswith('-')]
+            return words[0] if words else None
+        skip = {'nice': {'-n'}, 'ionice': {'-c', '-n'}, 'env': {'-u', '-C'}}.get(name, set())
+        i = 0
+        while i < len(args) and (args[i].startswith('-') or (name == 'env' and '=' in args[i])):
+            i += 2 if args[i] in skip else 1
+        return _program(args[i:], depth + 1)
+    if kind == 'shell':
+        for i, arg in enumerate(args):
+            if arg == '-c':
+                return _program(_split(args[i + 1]), depth + 1) if i + 1 < len(args) else None
+            if not arg.startswith('-'):
+                return arg  # a script file
+        return argv[0]
+    takes_value, inline_code, names_program = INTERPRETERS[kind]
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in inline_code:
+            return None
+        if arg in names_program:
+            return args[i + 1] if i + 1 < len(args) else None
+        if arg == '-' or not arg.startswith('-'):
+            return arg if arg != '-' else None
+        i += 2 if arg in takes_value else 1
+    return argv[0]
+
+
+def launch_targets(app_path):
+    """(real executable paths, program names) an app_cache value runs as
+
+    For an Exec line that goes through a wrapper or interpreter the target
+    is the script or app it names, not the interpreter. Both sets are empty
+    when nothing unambiguous is left to match (inline code, a bare 'env').
+    """
+    if os.path.exists(app_path):
+        command = app_path
+    else:
+        # A command name or an Exec line with arguments
+        command = _program(_split(app_path)) if app_path.strip() else None
+        if command is None:
+            return set(), set()
+    resolved = shutil.which(command) or command
+    paths = set()
+    if os.path.isabs(resolved):
+        real = os.path.realpath(resolved)
+        # /snap/bin/foo is a link to snap itself: only the name says which app
+        if _runner(real) is None or _runner(resolved) is not None:
+            paths = {os.path.normpath(resolved), real}
+    names = set()
+    for path in (command, resolved, *paths):
+        name = os.path.basename(path.rstrip('/'))
+        for suffix in ('.exe', '.app'):
+            if name.lower().endswith(suffix):
+                name = name[:-len(suffix)]
+        if name:
+            names.add(name)
+    return paths, names
+
+
+class ProcessTable:
+    """The current user's processes, read from /proc
+
+    refresh() only reads the details of PIDs it hasn't seen before; known
+    PIDs cost one small read to check they haven't exited or been reused.
+    Without /proc find() asks pgrep for exact name matches (macOS) or walks
+    a Toolhelp snapshot of image names (Windows); available is False where
+    none of these work.
+    """
+
+    def __init__(self, proc='/proc'):
+        self.proc = proc
+        self.has_proc = os.path.isdir(f"{proc}/self")
+        self.windows = sys.platform == 'win32'
+        self.pgrep = None if self.has_proc or self.windows else shutil.which('pgrep')
+        self.available = self.has_proc or self.windows or self.pgrep is not None
+        self.processes = {}
+        self.uid = os.getuid() if hasattr(os, 'getuid') else None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        if not self.has_proc:
+            return
+        with self.lock:
+            current = {}
+            own_pid = os.getpid()
+            try:
+                it = os.scandir(self.proc)
+            except OSError:
+                return
+            with it:
+                for entry in it:
+                    if not entry.name.isdigit():
+                        continue
+                    pid = int(entry.name)
+                    if pid == own_pid:
+                        continue
+                    known = self.processes.get(pid)
+                    if known is not None:
+                        stat = _read_stat(self.proc, pid)
+                        if stat is not None and stat[1] == known.start and stat[0] != b'Z':
+                            current[pid] = known
+                        continue
+                    try:
+                        if self.uid is not None and entry.stat().st_uid != self.uid:
+                            continue  # not ours to signal
+                    except OSError:
+                        continue
+                    info = _read_process(self.proc, pid)
+                    if info is not None:
+                        current[pid] = info
+            self.processes = current
+
+    def find(self, app_path):
+        """PIDs of running processes that are the app behind app_path
+
+        Matches the real executable path, or the exact program name (never a
+        pattern). Processes running a wrapper or interpreter are matched by
+        the script or app they run (see _program), so an interpreter never
+        stands in for the app. Nothing is found if app_path names no
+        unambiguous target.
+        """
+        paths, names = launch_targets(app_path)
+        if not paths and not names:
+            return []
+        if self.windows:
+            return _windows_find({name.lower() for name in names})
+        if not self.has_proc:
+            return self._pgrep(names)
+        short_names = {name[:COMM_LENGTH] for name in names}
+        self.refresh()
+        with self.lock:
+            processes = list(self.processes.values())
+        return [info.pid for info in processes if _matches(info, paths, names, short_names)]
+
+    def _pgrep(self, names):
+        if self.pgrep is None:
+            return []
+        pids = set()
+        for name in names:
+            # -x: the whole process name must match, not a substring
+            result = subprocess.run([self.pgrep, '-x', '-U', str(self.uid), name],
+                                    capture_output=True, text=True)
+            pids.update(int(pid) for pid in result.stdout.split() if pid.isdigit())
+        pids.discard(os.getpid())
+        return sorted(pids)
+
+
+def _matches(info, paths, names, short_names):
+    if not info.argv:
+        return info.name in short_names  # argv hidden or empty: only comm is left
+    if info.exe in paths and _runner(info.exe) is None:
+        return True
+    program = _program(info.argv)
+    if program is None:
+        return False
+    return os.path.basename(program) in names or (os.path.isabs(program) and program in paths)
+
+
+def is_alive(pid):
+    """True while pid exists and isn't a zombie"""
+    stat = _read_stat('/proc', pid)
+    if stat is not None:
+        return stat[0] != b'Z'
+    if os.path.isdir('/proc/self'):
+        return False
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def terminate(pids, timeout=3.0, groups=(), alive=is_alive, interval=0.05):
+    """Ask pids to exit (SIGTERM), and SIGKILL whatever is left after timeout
+
+    PIDs in groups are process group leaders started by us; the whole group
+    is signalled so helper children go too. alive(pid) decides when a
+    process is gone (callers pass Popen.poll for their own children so they
+    get reaped). On Windows see _windows_terminate. Returns (exited, killed)
+    counts.
+    """
+    if sys.platform == 'win32':
+        return _windows_terminate(pids, timeout)
+
+    def send(pid, sig):
+        try:
+            if pid in groups:
+                os.killpg(pid, sig)
+            else:
+                os.kill(pid, sig)
+        except OSError:
+            pass
+
+    for pid in pids:
+        send(pid, signal.SIGTERM)
+    deadline = time.monotonic() + timeout
+    remaining = [pid for pid in pids if alive(pid)]
+    while remaining and time.monotonic() < deadline:
+        time.sleep(interval)
+        remaining = [pid for pid in remaining if alive(pid)]
+    kill = getattr(signal, 'SIGKILL', signal.SIGTERM)
+    for pid in remaining:
+        send(pid, kill)
+    return len(pids) - len(remaining), len(remaining)
+
+
+# ---------------------------------------------------------------- Windows
+# Through ctypes, so closing an app doesn't start taskkill/tasklist processes
+
+TH32CS_SNAPPROCESS = 0x2
+WM_CLOSE = 0x0010
+SYNCHRONIZE = 0x00100000
+PROCESS_TERMINATE = 0x0001
+WAIT_OBJECT_0 = 0
+
+
+def _kernel32():
+    import ctypes
+    from ctypes import wintypes
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    kernel32.CreateToolhelp32Snapshot.argtypes = (wintypes.DWORD, wintypes.DWORD)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    kernel32.WaitForSingleObject.argtypes = (wintypes.HANDLE, wintypes.DWORD)
+    kernel32.TerminateProcess.argtypes = (wintypes.HANDLE, wintypes.UINT)
+    kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+    return kernel32
+
+
+def _windows_find(names):
+    """PIDs whose image name (without .exe, lower case) is in names"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [('dwSize', wintypes.DWORD), ('cntUsage', wintypes.DWORD),
+                    ('th32ProcessID', wintypes.DWORD), ('th32DefaultHeapID', ctypes.c_void_p),
+                    ('th32ModuleID', wintypes.DWORD), ('cntThreads', wintypes.DWORD),
+                    ('th32ParentProcessID', wintypes.DWORD), ('pcPriClassBase', wintypes.LONG),
+                    ('dwFlags', wintypes.DWORD), ('szExeFile', wintypes.WCHAR * 260)]
+
+    kernel32 = _kernel32()
+    kernel32.Process32FirstW.argtypes = (wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W))
+    kernel32.Process32NextW.argtypes = (wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W))
+    snapshot = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+    if snapshot is None or snapshot == ctypes.c_void_p(-1).value:
+        return []
+    pids = []
+    own_pid = os.getpid()
+    try:
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(PROCESSENTRY32W)
+        ok = kernel32.Process32FirstW(snapshot, ctypes.byref(entry))
+        while ok:
+            image = entry.szExeFile.lower()
+            if image.endswith('.exe'):
+                image = image[:-4]
+            if image in names and entry.th32ProcessID != own_pid:
+                pids.append(entry.th32ProcessID)
+            ok = kernel32.Process32NextW(snapshot, ctypes.byref(entry))
+    finally:
+        kernel32.CloseHandle(snapshot)
+    return pids
+
+
+def _windows_terminate(pids, timeout):
+    """Post WM_CLOSE to the pids' windows, TerminateProcess what's left after timeout
+
+    The same as taskkill followed by taskkill /f, without the child
+    processes. PIDs that can't be opened (another user's) are skipped.
+    """
+    import ctypes
+    from ctypes import wintypes
+    kernel32 = _kernel32()
+    user32 = ctypes.WinDLL('user32', use_last_error=True)
+
+    handles = {}
+    for pid in pids:
+        handle = kernel32.OpenProcess(SYNCHRONIZE | PROCESS_TERMINATE, False, pid)
+        if handle:
+            handles[pid] = handle
+    try:
+        targets = set(handles)
+
+        @ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+        def close_window(hwnd, _):
+            owner = wintypes.DWORD()
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(owner))
+            if owner.value in targets:
+                user32.PostMessageW(hwnd, WM_CLOSE, 0, 0)
+            return True
+
+        user32.EnumWindows(close_window, 0)
+        deadline = time.monotonic() + timeout
+        killed = 0
+        for pid, handle in handles.items():
+            remaining_ms = max(int((deadline - time.monotonic()) * 1000), 0)
+            if kernel32.WaitForSingleObject(handle, remaining_ms) != WAIT_OBJECT_0:
+                kernel32.TerminateProcess(handle, 1)
+                killed += 1
+        return len(handles) - killed, killed
+    finally:
+        for handle in handles.values():
+            kernel32.CloseHandle(handle)
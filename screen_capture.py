@@ -0,0 +1,321 @@
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+# File extension per output format
+FORMATS = {'png': '.png', 'webp': '.webp', 'jpeg': '.jpg'}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+class Frame:
+    """One captured screen, not yet encoded
+
+    Either a PIL image (what pyautogui returns) or tightly packed raw
+    pixels in data with mode 'RGB' or 'RGBA'.
+    """
+
+    def __init__(self, width, height, data=None, mode='RGB', image=None):
+        self.width = width
+        self.height = height
+        self.data = data
+        self.mode = mode
+        self.image = image
+        self.captured_at = time.time()
+
+
+# ---------------------------------------------------------------- sources
+
+class PyAutoGUISource:
+    """Screen grabs through pyautogui (imported on first use)"""
+
+    def size(self):
+        import pyautogui
+        width, height = pyautogui.size()
+        return width, height
+
+    def grab(self, region=None):
+        import pyautogui
+        image = pyautogui.screenshot(region=region)
+        return Frame(image.width, image.height, image=image)
+
+
+class FakeFramebufferSource:
+    """Synthetic RGB framebuffer for headless runs and benchmarks
+
+    The pixels are generated once; full-screen and full-width grabs hand
+    out views of that buffer, other regions copy just the pixels they need.
+    """
+
+    def __init__(self, width=1920, height=1080):
+        self.width = width
+        self.height = height
+        row = bytearray(width * 3)
+        for x in range(width):
+            row[x * 3:x * 3 + 3] = bytes((x * 255 // max(width - 1, 1), 128, 255 - x * 255 // max(width - 1, 1)))
+        buffer = bytearray()
+        for y in range(height):
+            # Vary the rows a little so the frame isn't trivially compressible
+            shade = y * 255 // max(height - 1, 1)
+            buffer += row[:(y % 7) * 3] + bytes((shade,)) * 3 + row[(y % 7) * 3 + 3:]
+        self.buffer = bytes(buffer)
+        self.grabs = 0
+
+    def size(self):
+        return self.width, self.height
+
+    def grab(self, region=None):
+        self.grabs += 1
+        if region is None:
+            return Frame(self.width, self.height, memoryview(self.buffer))
+        left, top, width, height = clip_region(region, self.width, self.height)
+        stride = self.width * 3
+        view = memoryview(self.buffer)
+        if width == self.width:
+            # Whole rows are contiguous: no copy at all
+            return Frame(width, height, view[top * stride:(top + height) * stride])
+        data = bytearray()
+        for y in range(top, top + height):
+            start = y * stride + left * 3
+            data += view[start:start + width * 3]
+        return Frame(width, height, data)
+
+
+def clip_region(region, screen_width, screen_height):
+    """Clamp (left, top, width, height) to the screen"""
+    left, top, width, height = (int(v) for v in region)
+    left = min(max(left, 0), screen_width - 1)
+    top = min(max(top, 0), screen_height - 1)
+    width = max(min(width, screen_width - left), 1)
+    height = max(min(height, screen_height - top), 1)
+    return left, top, width, height
+
+
+# ---------------------------------------------------------------- encoding
+
+def _png_chunk(f, tag, data):
+    f.write(struct.pack('>I', len(data)))
+    f.write(tag)
+    f.write(data)
+    f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(tag)) & 0xffffffff))
+
+
+def write_png(frame, path, compress_level=3):
+    """Encode a raw frame as PNG with only the standard library
+
+    Rows are fed to the compressor as memoryview slices, so the frame is
+    never copied on the way in.
+    """
+    channels = {'RGB': 3, 'RGBA': 4}[frame.mode]
+    stride = frame.width * channels
+    view = memoryview(frame.data)
+    compressor = zlib.compressobj(compress_level)
+    compressed = []
+    for y in range(frame.height):
+        compressed.append(compressor.compress(b'\x00'))  # filter type: none
+        compressed.append(compressor.compress(view[y * stride:(y + 1) * stride]))
+    compressed.append(compressor.flush())
+    header = struct.pack('>IIBBBBB', frame.width, frame.height, 8,
+                         2 if channels == 3 else 6, 0, 0, 0)
+    with open(path, 'wb') as f:
+        f.write(PNG_SIGNATURE)
+        _png_chunk(f, b'IHDR', header)
+        _png_chunk(f, b'IDAT', b''.join(compressed))
+        _png_chunk(f, b'IEND', b'')
+
+
+def pillow_formats():
+    """Output formats Pillow can write here (empty without Pillow)"""
+    try:
+        from PIL import features
+    except ImportError:
+        return set()
+    formats = {'png'}
+    if features.check('jpg'):
+        formats.add('jpeg')
+    if features.check('webp'):
+        formats.add('webp')
+    return formats
+
+
+def encode_frame(frame, path, fmt='png', quality=85, compress_level=3):
+    """Write frame to path in fmt; returns the number of bytes written"""
+    if frame.image is None and fmt == 'png':
+        write_png(frame, path, compress_level)
+        return os.path.getsize(path)
+
+    from PIL import Image
+    image = frame.image
+    if image is None:
+        image = Image.frombuffer(frame.mode, (frame.width, frame.height), frame.data,
+                                 'raw', frame.mode, 0, 1)
+    if fmt == 'png':
+        image.save(path, 'PNG', compress_level=compress_level)
+    elif fmt == 'jpeg':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(path, 'JPEG', quality=quality)
+    else:
+        image.save(path, 'WEBP', quality=quality, method=4)
+    return os.path.getsize(path)
+
+
+# ---------------------------------------------------------------- capture
+
+class ScreenCapture:
+    """Grabs the screen on the caller's thread and encodes on a worker
+
+    capture() only pays for the grab; the frame is queued and written by
+    a background thread, so a 4K PNG no longer holds up the next command.
+    Formats other than PNG need Pillow; without it they fall back to PNG.
+    Raw frames reach the encoder as they were grabbed: the only copy is the
+    crop for a region on sources that can't grab one directly.
+    """
+
+    def __init__(self, source=None, directory=None, fmt='png', quality=85, compress_level=3,
+                 tracer=None):
+        self.source = source or PyAutoGUISource()
+        self.directory = directory or '.'
+        self.quality = quality
+        self.compress_level = compress_level
+        # Optional tracing.Tracer for 'screenshot.grab'/'screenshot.encode' spans
+        self.tracer = tracer
+        self.format = fmt
+        if fmt != 'png' and fmt not in pillow_formats():
+            print(f"⚠️  Can't write {fmt} screenshots (needs Pillow with {fmt} support); using PNG")
+            self.format = 'png'
+        self.stats = {'frames': 0, 'bytes': 0, 'grab_seconds': 0.0, 'encode_seconds': 0.0}
+        self.queue = queue.Queue()
+        self.idle = threading.Event()
+        self.idle.set()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._issued = set()
+        self._issued_stem = None
+        self.thread = threading.Thread(target=self._loop, name="screenshot-encoder", daemon=True)
+        self.thread.start()
+
+    def _span(self, name, **attrs):
+        if self.tracer is None:
+            return _NoSpan()
+        return self.tracer.span(name, **attrs)
+
+    def filename(self):
+        """screenshot_<time>.<ext>, with _2, _3, ... for more in the same second"""
+        stem = os.path.join(self.directory, f"screenshot_{time.strftime('%Y%m%d_%H%M%S')}")
+        extension = FORMATS[self.format]
+        with self._lock:
+            if stem != self._issued_stem:
+                self._issued_stem = stem
+                self._issued.clear()
+            path = f"{stem}{extension}"
+            n = 1
+            # Earlier frames from this second may still be in the queue
+            while path in self._issued or os.path.exists(path):
+                n += 1
+                path = f"{stem}_{n}{extension}"
+            self._issued.add(path)
+        return path
+
+    def region(self, name):
+        """Named part of the screen ('left half', 'top half', ...) as a region"""
+        width, height = self.source.size()
+        return {
+            'left': (0, 0, width // 2, height),
+            'right': (width // 2, 0, width - width // 2, height),
+            'top': (0, 0, width, height // 2),
+            'bottom': (0, height // 2, width, height - height // 2),
+        }[name]
+
+    def capture(self, region=None, path=None, on_saved=None):
+        """Grab now, encode later; returns the path the file will have
+
+        on_saved(path) runs on the encoder thread once the file is written,
+        or with None if it couldn't be.
+        """
+        if path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.filename()
+        started = time.perf_counter()
+        with self._span('screenshot.grab', region=region is not None):
+            frame = self.source.grab(region)
+        self.stats['grab_seconds'] += time.perf_counter() - started
+        with self._lock:
+            self._pending += 1
+            self.idle.clear()
+        self.queue.put((frame, path, on_saved))
+        return path
+
+    def capture_repeated(self, count, interval, region=None, on_done=None):
+        """Take count screenshots interval seconds apart on a background thread
+
+        on_done(paths) runs once every file has been written.
+        """
+        def run():
+            paths = []
+            try:
+                for i in range(count):
+                    if i:
+                        time.sleep(interval)
+                    paths.append(self.capture(region))
+                self.wait()
+            except Exception as e:
+                print(f"Screenshot failed: {e}")
+            finally:
+                if on_done is not None:
+                    on_done(paths)
+        thread = threading.Thread(target=run, name="screenshot-repeat", daemon=True)
+        thread.start()
+        return thread
+
+    def wait(self, timeout=None):
+        """Block until every queued frame has been written"""
+        return self.idle.wait(timeout)
+
+    def close(self):
+        self.wait()
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def _loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame, path, on_saved = item
+            started = time.perf_counter()
+            # Written under a temporary name so nobody sees half a file
+            tmp_path = f"{path}.part"
+            try:
+                with self._span('screenshot.encode', format=self.format):
+                    size = encode_frame(frame, tmp_path, self.format, self.quality, self.compress_level)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"Could not save screenshot {path}: {e}")
+                size = None
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            self.stats['encode_seconds'] += time.perf_counter() - started
+            if size is not None:
+                self.stats['frames'] += 1
+                self.stats['bytes'] += size
+            if on_saved is not None:
+                on_saved(path if size is not None else None)
+            with self._lock:
+                self._pending -= 1
+                if self._pending <= 0:
+                    self._pending = 0
+                    self.idle.set()
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
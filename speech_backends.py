@@ -0,0 +1,380 @@
+import json
+import time
+import wave
+from array import array
+from collections import deque
+
+try:
+    import audioop  # removed in Python 3.13
+except ImportError:
+    audioop = None
+
+
+class ListenTimeout(Exception):
+    """Nobody started speaking before the timeout"""
+
+
+class ServiceUnavailable(Exception):
+    """The recognizer backend couldn't be reached or loaded"""
+
+
+def frame_rms(frame, sample_width=2):
+    """Root mean square energy of a 16-bit PCM frame"""
+    if audioop is not None:
+        return audioop.rms(frame, sample_width)
+    samples = array('h', frame)
+    if not samples:
+        return 0
+    return int((sum(s * s for s in samples) / len(samples)) ** 0.5)
+
+
+# ---------------------------------------------------------------- sources
+
+class MicrophoneSource:
+    """Frames from a speech_recognition Microphone, kept open between utterances
+
+    Opening the PyAudio stream per utterance costs time on every command,
+    so the stream is opened on first use and reused until close().
+    """
+
+    def __init__(self, microphone):
+        self.microphone = microphone
+        self.stream = None
+
+    def open(self):
+        if self.stream is None:
+            self.microphone.__enter__()
+            self.stream = self.microphone.stream
+        return self
+
+    @property
+    def sample_rate(self):
+        return self.microphone.SAMPLE_RATE
+
+    @property
+    def sample_width(self):
+        return self.microphone.SAMPLE_WIDTH
+
+    @property
+    def frame_seconds(self):
+        return self.microphone.CHUNK / self.microphone.SAMPLE_RATE
+
+    def frames(self):
+        self.open()
+        while True:
+            yield self.stream.read(self.microphone.CHUNK)
+
+    def discard_pending(self):
+        """Throw away audio buffered while nobody was reading the stream"""
+        if self.stream is None:
+            return
+        try:
+            available = self.stream.pyaudio_stream.get_read_available()
+        except (AttributeError, OSError):
+            return
+        if available:
+            self.stream.read(available)
+
+    def close(self):
+        if self.stream is not None:
+            self.microphone.__exit__(None, None, None)
+            self.stream = None
+
+
+class WavFileSource:
+    """Frames from a 16-bit WAV file, for benchmarks without a mic
+
+    With realtime=True frames are paced like a live microphone so latency
+    numbers include the time spent waiting for audio.
+    """
+
+    def __init__(self, path, frame_ms=30, realtime=False):
+        self.path = path
+        self.realtime = realtime
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+            self.sample_rate = wav.getframerate()
+            self.channels = wav.getnchannels()
+        self.sample_width = 2
+        self.chunk = max(int(self.sample_rate * frame_ms / 1000), 1)
+        self.frame_seconds = self.chunk / self.sample_rate
+        self.exhausted = False
+        self._wav = None
+
+    def open(self):
+        if self._wav is None:
+            self._wav = wave.open(self.path, 'rb')
+        return self
+
+    def frames(self):
+        self.open()
+        started = time.perf_counter()
+        sent = 0
+        while True:
+            frame = self._wav.readframes(self.chunk)
+            if not frame:
+                self.exhausted = True
+                return
+            if self.channels == 2:
+                frame = to_mono(frame)
+            if self.realtime:
+                sent += self.frame_seconds
+                delay = started + sent - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield frame
+
+    def discard_pending(self):
+        pass
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+def to_mono(frame):
+    """Average the two channels of an interleaved 16-bit stereo frame"""
+    if audioop is not None:
+        return audioop.tomono(frame, 2, 0.5, 0.5)
+    samples = array('h', frame)
+    return array('h', ((samples[i] + samples[i + 1]) // 2
+                       for i in range(0, len(samples) - 1, 2))).tobytes()
+
+
+# ---------------------------------------------------------------- VAD
+
+class EnergyVAD:
+    """Energy based voice activity detection with an adaptive noise floor
+
+    Calibrated once from ambient audio, then the floor keeps following
+    background noise on every frame that isn't speech, so there's no need to
+    re-measure the room before each command.
+    """
+
+    def __init__(self, ratio=3.0, min_threshold=300, adapt=0.05):
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self.adapt = adapt
+        self.noise_floor = None
+
+    @property
+    def threshold(self):
+        if self.noise_floor is None:
+            return self.min_threshold
+        return max(self.noise_floor * self.ratio, self.min_threshold)
+
+    def calibrate(self, frames, sample_width=2):
+        energies = [frame_rms(frame, sample_width) for frame in frames]
+        if energies:
+            self.noise_floor = sum(energies) / len(energies)
+
+    def is_speech(self, frame, sample_width=2):
+        energy = frame_rms(frame, sample_width)
+        if energy > self.threshold:
+            return True
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        else:
+            self.noise_floor += self.adapt * (energy - self.noise_floor)
+        return False
+
+
+# ---------------------------------------------------------------- backends
+
+class GoogleBackend:
+    """Google Web Speech via speech_recognition (needs internet)
+
+    Not streaming: the utterance is collected and sent in one request once
+    the VAD says it has ended.
+    """
+
+    name = 'google'
+    streaming = False
+
+    def __init__(self, recognizer=None):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = recognizer or sr.Recognizer()
+        self.buffer = []
+
+    def start(self, sample_rate, sample_width):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.buffer = []
+
+    def accept(self, frame):
+        self.buffer.append(frame)
+
+    def finish(self):
+        audio = self.sr.AudioData(b''.join(self.buffer), self.sample_rate, self.sample_width)
+        self.buffer = []
+        try:
+            return self.recognizer.recognize_google(audio).lower()
+        except self.sr.UnknownValueError:
+            return ""
+        except self.sr.RequestError as e:
+            raise ServiceUnavailable(str(e))
+
+
+class VoskBackend:
+    """Offline recognition with Vosk; frames are decoded as they arrive
+
+    By the time the speaker stops most of the audio has already been
+    decoded, so finish() only has to flush the last few frames.
+    """
+
+    name = 'vosk'
+    streaming = True
+
+    def __init__(self, model_path, grammar=None):
+        try:
+            import vosk
+        except ImportError:
+            raise ServiceUnavailable("vosk is not installed (pip install vosk)")
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        try:
+            self.model = vosk.Model(model_path)
+        except Exception as e:
+            raise ServiceUnavailable(f"could not load Vosk model from {model_path}: {e}")
+        self.grammar = json.dumps(grammar) if grammar else None
+        self.decoder = None
+        self.sample_rate = None
+
+    def start(self, sample_rate, sample_width):
+        # KaldiRecognizer.Reset() is much cheaper than building a new one
+        if self.decoder is not None and sample_rate == self.sample_rate:
+            self.decoder.Reset()
+            return
+        self.sample_rate = sample_rate
+        if self.grammar:
+            self.decoder = self.vosk.KaldiRecognizer(self.model, sample_rate, self.grammar)
+        else:
+            self.decoder = self.vosk.KaldiRecognizer(self.model, sample_rate)
+
+    def accept(self, frame):
+        self.decoder.AcceptWaveform(frame)
+
+    def finish(self):
+        result = json.loads(self.decoder.FinalResult())
+        return result.get('text', '').lower()
+
+
+def create_backend(name, model_path=None, recognizer=None):
+    """Recognizer backend by name: 'google' or 'vosk'"""
+    if name == 'vosk':
+        if not model_path:
+            raise ServiceUnavailable("the vosk backend needs a model folder (--vosk-model)")
+        return VoskBackend(model_path)
+    if name == 'google':
+        return GoogleBackend(recognizer)
+    raise ValueError(f"unknown speech backend: {name}")
+
+
+# ---------------------------------------------------------------- listener
+
+class StreamingListener:
+    """Feeds audio frames through the VAD into a recognizer backend
+
+    Speech starts when a frame clears the VAD threshold (a short pre-roll is
+    kept so the first syllable isn't cut off) and ends after end_silence
+    seconds of quiet, rather than at a fixed phrase length.
+    """
+
+    def __init__(self, source, backend, vad=None, end_silence=0.5, preroll=0.3):
+        self.source = source
+        self.backend = backend
+        self.vad = vad or EnergyVAD()
+        self.end_silence = end_silence
+        self.preroll = preroll
+        self.calibrated = False
+        # Timings of the last utterance, in seconds
+        self.last_timing = {}
+
+    def calibrate(self, duration=0.5):
+        """Measure ambient noise once; the VAD keeps adapting afterwards"""
+        frames = []
+        needed = max(int(duration / self.source.frame_seconds), 1)
+        for frame in self.source.frames():
+            frames.append(frame)
+            if len(frames) >= needed:
+                break
+        self.vad.calibrate(frames, self.source.sample_width)
+        self.calibrated = True
+
+    def listen(self, timeout=5, phrase_time_limit=10, stop=None):
+        """Return the recognized text of the next utterance ('' if not understood)
+
+        Raises ListenTimeout if nobody speaks within timeout seconds (or
+        before the threading.Event stop is set),
+        ServiceUnavailable if the backend fails and EOFError once a file
+        source has run out of audio.
+        """
+        calibration = 0.0
+        if not self.calibrated:
+            calibration_started = time.perf_counter()
+            self.calibrate()
+            calibration = time.perf_counter() - calibration_started
+
+        frame_seconds = self.source.frame_seconds
+        sample_width = self.source.sample_width
+        self.backend.start(self.source.sample_rate, sample_width)
+        pending = deque(maxlen=max(int(self.preroll / frame_seconds), 1))
+        waited = 0.0
+        spoken = 0.0
+        silence = 0.0
+        speaking = False
+        started = time.perf_counter()
+
+        for frame in self.source.frames():
+            is_speech = self.vad.is_speech(frame, sample_width)
+            if not speaking:
+                if stop is not None and stop.is_set():
+                    raise ListenTimeout()
+                pending.append(frame)
+                if is_speech:
+                    speaking = True
+                    speech_started = time.perf_counter()
+                    for buffered in pending:
+                        self.backend.accept(buffered)
+                    spoken = len(pending) * frame_seconds
+                    continue
+                waited += frame_seconds
+                if timeout and waited >= timeout:
+                    raise ListenTimeout()
+                continue
+
+            self.backend.accept(frame)
+            spoken += frame_seconds
+            silence = 0.0 if is_speech else silence + frame_seconds
+            if silence >= self.end_silence:
+                break
+            if phrase_time_limit and spoken >= phrase_time_limit:
+                break
+
+        if not speaking:
+            if getattr(self.source, 'exhausted', False):
+                raise EOFError()
+            raise ListenTimeout()
+
+        speech_ended = time.perf_counter()
+        text = self.backend.finish()
+        finished = time.perf_counter()
+        self.last_timing = {
+            # Ambient noise measurement; only non-zero on the first listen
+            'calibrate': calibration,
+            'wait': speech_started - started,
+            'speech': spoken,
+            'capture': speech_ended - speech_started,
+            # What the user actually waits for after they stop talking
+            'decode': finished - speech_ended,
+        }
+        return text
+
+    def discard_pending(self):
+        self.source.discard_pending()
+
+    def close(self):
+        self.source.close()
@@ -0,0 +1,24 @@
+"""Shared fixtures: a headless assistant with fakes for every device"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import UniversalVoiceAssistant  # noqa: E402
+from media_launcher import StubResolver  # noqa: E402
+from screen_capture import FakeFramebufferSource  # noqa: E402
+
+
+@pytest.fixture
+def assistant(tmp_path):
+    assistant = UniversalVoiceAssistant(voice_input=False, tts_backend='null',
+                                        cache_path=str(tmp_path / 'apps.json'),
+                                        usage_path=str(tmp_path / 'usage.json'),
+                                        media_resolver=StubResolver(),
+                                        screen_source=FakeFramebufferSource(64, 48),
+                                        screenshot_dir=str(tmp_path))
+    assistant.scan_done.wait()
+    yield assistant
+    assistant.shutdown()
@@ -0,0 +1,39 @@
+"""Tests for starting apps without a shell
+
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_launcher import Launcher  # noqa: E402
+
+
+def wait_for_exit(process, timeout=10):
+    deadline = time.monotonic() + timeout
+    while process.poll() is None:
+        assert time.monotonic() < deadline, "child did not exit"
+        time.sleep(0.02)
+    return process.returncode
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="POSIX descriptors")
+def test_launched_apps_do_not_inherit_our_descriptors():
+    read_end, write_end = os.pipe()
+    os.set_inheritable(write_end, True)  # like a C library that skips O_CLOEXEC
+    try:
+        check = f"import os\ntry:\n    os.fstat({write_end})\nexcept OSError:\n    raise SystemExit(0)\nraise SystemExit(1)"
+        process = Launcher(reap_interval=60).launch([sys.executable, '-c', check])
+        assert wait_for_exit(process) == 0
+    finally:
+        os.close(read_end)
+        os.close(write_end)
+
+
+def test_missing_program_raises():
+    with pytest.raises(FileNotFoundError):
+        Launcher().launch('no-such-program-anywhere --flag')
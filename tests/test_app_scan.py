@@ -0,0 +1,192 @@
+"""Tests for scanning app folders and reusing the scan across starts
+
+The assistant is pointed at a few temporary bin folders instead of the
+real system ones.
+
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_cache import CACHE_VERSION, AppCacheStore  # noqa: E402
+from app_scanner import scan_bin_dir  # noqa: E402
+from app_watcher import PollingWatcher  # noqa: E402
+from main import UniversalVoiceAssistant  # noqa: E402
+
+BIN_DIRS = 2
+
+
+class TreeAssistant(UniversalVoiceAssistant):
+    """Assistant whose only search roots are tree/bin0, tree/bin1, ..."""
+
+    def __init__(self, tree, **kwargs):
+        self.tree = tree
+        super().__init__(voice_input=False, tts_backend='null', **kwargs)
+
+    def _scan_windows_apps(self):
+        self._scan_tree()
+
+    def _scan_macos_apps(self):
+        self._scan_tree()
+
+    def _scan_linux_apps(self):
+        self._scan_tree()
+
+    def _scan_tree(self):
+        for i in range(BIN_DIRS):
+            path = os.path.join(self.tree, f'bin{i}')
+            self._scan_flat_dir(f"bin:{path}", path, scan_bin_dir, self._bin_entries, self._bin_keys)
+
+
+def add_program(tree, folder, name):
+    path = os.path.join(tree, folder, name)
+    with open(path, 'w') as f:
+        f.write('#!/bin/sh\n')
+    os.chmod(path, 0o755)
+    # Coarse filesystem clocks: make sure the folder's mtime moves
+    stat = os.stat(os.path.join(tree, folder))
+    os.utime(os.path.join(tree, folder), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    return path
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'tree'
+    for i in range(BIN_DIRS):
+        os.makedirs(root / f'bin{i}')
+    add_program(str(root), 'bin0', 'alpha')
+    add_program(str(root), 'bin1', 'beta')
+    return str(root)
+
+
+@pytest.fixture
+def start(tree, tmp_path):
+    """start(**kwargs) -> a scanned TreeAssistant sharing one cache file"""
+    started = []
+
+    def start(**kwargs):
+        assistant = TreeAssistant(tree, cache_path=str(tmp_path / 'apps.json'),
+                                  usage_path=str(tmp_path / 'usage.json'), **kwargs)
+        assistant.scan_done.wait()
+        started.append(assistant)
+        return assistant
+    yield start
+    for assistant in started:
+        assistant.shutdown()
+
+
+def test_second_start_reuses_every_unchanged_root(start):
+    first = start()
+    assert first.rescanned_sources == BIN_DIRS
+    assert {'alpha', 'beta'} <= set(first.app_cache)
+
+    second = start()
+    assert second.rescanned_sources == 0
+    assert second.app_cache == first.app_cache
+
+
+def test_only_the_changed_root_is_rescanned(start, tree):
+    start()
+    add_program(tree, 'bin1', 'gamma')
+    assistant = start()
+    assert assistant.rescanned_sources == 1
+    assert assistant.find_app('gamma') == 'gamma'
+    assert 'alpha' in assistant.app_cache
+
+
+def test_rebuild_rescans_everything(start):
+    start()
+    assert start(rebuild_cache=True).rescanned_sources == BIN_DIRS
+
+
+def test_cache_from_another_version_is_ignored(tmp_path):
+    path = tmp_path / 'apps.json'
+    sources = {'bin:/x': {'stamp': {'/x': 1}, 'entries': {'x': '/x/x'}}}
+    path.write_text(json.dumps({'version': CACHE_VERSION - 1, 'os': 'Linux', 'sources': sources}))
+    assert AppCacheStore('Linux', str(path)).sources == {}
+    path.write_text(json.dumps({'version': CACHE_VERSION, 'os': 'Linux', 'sources': sources}))
+    store = AppCacheStore('Linux', str(path))
+    assert store.lookup('bin:/x', lambda key: 1) == {'x': '/x/x'}
+    assert store.lookup('bin:/x', lambda key: 2) is None
+    assert AppCacheStore('Windows', str(path)).sources == {}
+
+
+class SlowRootsAssistant(TreeAssistant):
+    """Two roots with the same key; the first one takes longest to scan"""
+
+    def __init__(self, tree, release, **kwargs):
+        self.release = release
+        super().__init__(tree, **kwargs)
+
+    def _scan_tree(self):
+        def slow():
+            self.release.wait(5)
+            return {'dup': '/first/dup', 'slow': '/first/slow'}, {}
+        self._scan_source('first', None, slow)
+        self._scan_source('second', None, lambda: ({'dup': '/second/dup', 'fast': '/second/fast'}, {}))
+
+
+def test_scan_runs_in_the_background_and_later_roots_win(tree, tmp_path):
+    release = threading.Event()
+    assistant = SlowRootsAssistant(tree, release, cache_path=str(tmp_path / 'apps.json'),
+                                   usage_path=str(tmp_path / 'usage.json'))
+    try:
+        # The constructor didn't wait for the slow root, and the fast one
+        # is already searchable
+        assert not assistant.scan_done.is_set()
+        deadline = time.monotonic() + 5
+        while assistant.find_app('fast') is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        release.set()
+        assert assistant.scan_done.wait(5)
+        # Merged in registration order, as a sequential scan would
+        assert assistant.app_cache == {'dup': '/second/dup', 'slow': '/first/slow',
+                                       'fast': '/second/fast'}
+    finally:
+        release.set()
+        assistant.shutdown()
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_watcher_adds_and_removes_apps(start, tree):
+    assistant = start(watch_apps=True)
+    assert assistant.watcher is not None
+    path = add_program(tree, 'bin0', 'delta')
+    wait_for(lambda: 'delta' in assistant.app_cache)
+    assert assistant.find_app('delta') == 'delta'
+    os.remove(path)
+    wait_for(lambda: 'delta' not in assistant.app_cache)
+    assert 'delta' not in assistant.app_index.keys
+    # The cache file follows, so the next start needn't rescan
+    assistant.stop_watcher()
+    assert start().rescanned_sources == 0
+
+
+def test_polling_watcher_reports_added_and_removed_names(tree):
+    changes = []
+    folder = os.path.join(tree, 'bin1')
+    watcher = PollingWatcher([folder], changes.append, interval=0.05)
+    watcher.start()
+    try:
+        path = add_program(tree, 'bin1', 'epsilon')
+        wait_for(lambda: changes)
+        assert changes[0] == {folder: {'epsilon'}}
+        os.remove(path)
+        wait_for(lambda: len(changes) == 2)
+        assert changes[1] == {folder: {'epsilon'}}
+    finally:
+        watcher.stop()
@@ -0,0 +1,82 @@
+"""Tests for learning which apps get used and by what name
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_usage import UsageStore  # noqa: E402
+
+DAY = 86400
+
+
+def age(store, path, days):
+    """Pretend path was last used days ago"""
+    store.apps[path]['updated'] -= days * DAY
+
+
+def test_counts_halve_every_half_life(tmp_path):
+    store = UsageStore(str(tmp_path / 'usage.json'), half_life_days=14)
+    for _ in range(4):
+        store.record('firefox', 'firefox', '/usr/bin/firefox')
+    age(store, '/usr/bin/firefox', 14)
+    store.record('code', 'code', '/usr/bin/code')
+    now = store.apps['/usr/bin/code']['updated']
+    assert abs(store._decayed(store.apps['/usr/bin/firefox'], now) - 2.0) < 0.01
+    # Relative to the most used app, which is still firefox
+    assert store.boosts['/usr/bin/firefox'] == 1.0
+    assert abs(store.boosts['/usr/bin/code'] - 0.5) < 0.01
+
+
+def test_recent_use_beats_an_old_favourite(tmp_path):
+    store = UsageStore(str(tmp_path / 'usage.json'), half_life_days=14)
+    for _ in range(8):
+        store.record('gimp', 'gimp', '/usr/bin/gimp')
+    age(store, '/usr/bin/gimp', 60)
+    store.record('krita', 'krita', '/usr/bin/krita')
+    assert store.top(2) == [('krita', '/usr/bin/krita'), ('gimp', '/usr/bin/gimp')]
+
+
+def test_compaction_forgets_faded_apps_and_bounds_both_tables(tmp_path):
+    store = UsageStore(str(tmp_path / 'usage.json'), max_apps=4, max_phrases=4)
+    store.record('old', 'old', '/usr/bin/old')
+    age(store, '/usr/bin/old', 365)
+    for i in range(5):
+        store.record(f'tool number {i}', f'tool{i}', f'/usr/bin/tool{i}')
+    # 6 apps is past 4 * 1.25: compacted back to the 4 best, the faded one first
+    assert len(store.apps) == 4
+    assert '/usr/bin/old' not in store.apps
+    assert len(store.phrases) == 4
+    # Up to a quarter over the limit is tolerated between compactions
+    store.record('tool number 5', 'tool5', '/usr/bin/tool5')
+    assert len(store.phrases) == 5
+    store.record('tool number 6', 'tool6', '/usr/bin/tool6')
+    assert len(store.phrases) == 4
+    assert 'tool number 6' in store.phrases and 'tool number 2' not in store.phrases
+
+
+def test_memo_survives_a_restart_and_skips_exact_names(tmp_path):
+    path = str(tmp_path / 'usage.json')
+    store = UsageStore(path)
+    store.record('fire fox', 'firefox', '/usr/bin/firefox')
+    store.record('firefox', 'firefox', '/usr/bin/firefox')
+    store.save()
+    reloaded = UsageStore(path)
+    assert reloaded.recall('fire fox') == ('firefox', '/usr/bin/firefox')
+    assert reloaded.recall('firefox') is None
+    reloaded.forget('fire fox')
+    assert reloaded.recall('fire fox') is None
+
+
+def test_assistant_answers_a_repeated_phrase_from_the_memo(assistant):
+    assistant.app_cache['firefox'] = '/usr/bin/firefox'
+    assistant.app_index.add('firefox', '/usr/bin/firefox')
+    assistant.usage.record('the browser', 'firefox', '/usr/bin/firefox')
+    assert assistant.find_app_entry('the browser') == ('firefox', '/usr/bin/firefox')
+    # Once the app is gone the memo is dropped instead of answering wrongly
+    del assistant.app_cache['firefox']
+    assistant.app_index.remove('firefox')
+    assert assistant.find_app_entry('the browser') is None
+    assert assistant.usage.recall('the browser') is None
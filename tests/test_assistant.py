@@ -0,0 +1,133 @@
+"""Regression tests for command routing, app ranking, playback and screenshots
+
+Runs headless: speech output goes to NullTTSBackend, YouTube lookups to
+StubResolver and screenshots come from FakeFramebufferSource.
+
+    python -m pytest tests
+"""
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_index import CANDIDATE_LIMIT, AppIndex  # noqa: E402
+from media_launcher import MediaLauncher, StubResolver, youtube_search_url  # noqa: E402
+from screen_capture import PNG_SIGNATURE, FakeFramebufferSource, ScreenCapture  # noqa: E402
+
+
+def calls_to(assistant, method):
+    """Replace assistant.method with a recorder; returns the list of calls"""
+    calls = []
+    setattr(assistant, method, lambda *args: calls.append(args))
+    return calls
+
+
+def test_stop_inside_a_word_does_not_exit(assistant):
+    opened = calls_to(assistant, 'open_application')
+    assert assistant.router.match("open laptop").intent.name == 'open'
+    assert assistant.process_command("open laptop") is True
+    assert opened == [("laptop",)]
+
+
+def test_exit_words_still_end_the_session(assistant):
+    assert assistant.process_command("stop") is False
+
+
+def test_search_keeps_words_that_contain_fillers(assistant):
+    searches = calls_to(assistant, 'google_search')
+    assistant.process_command("search for california")
+    assert searches == [("california",)]
+
+
+def test_replies_reach_the_null_backend(assistant):
+    assistant.process_command("what can you do")
+    assistant.tts.wait(5)
+    assert assistant.tts.backend.spoken
+    assert "open ANY application" in assistant.tts.backend.spoken[-1]
+
+
+def test_code_ranks_above_bitcode():
+    index = AppIndex()
+    index.build({'bitcode': '/usr/bin/bitcode', 'code': '/usr/bin/code',
+                 'llvm-bitcode-strip': '/usr/bin/llvm-bitcode-strip'})
+    results = index.search('code', k=3)
+    assert results[0][0] == 'code'
+    assert index.best_match('code') == 'code'
+
+
+def test_short_names_score_a_bounded_set_of_candidates():
+    cache = {f'app{i} tool': f'/usr/bin/app{i}' for i in range(5000)}
+    cache.update({'vs': '/usr/bin/vs', 'vscodium': '/usr/bin/vscodium', 'vx': '/usr/bin/vx',
+                  'visual studio': '/usr/bin/vstudio'})
+    index = AppIndex()
+    index.build(cache)
+    assert len(index.candidates('a')) <= CANDIDATE_LIMIT
+    assert index.best_match('vs') == 'vs'
+    assert [key for key, _, _ in index.search('vs', k=3)] == ['vs', 'vscodium', 'vx']
+    index.remove('vs')
+    assert 'vs' not in index.candidates('vs')
+    assert index.best_match('vs') == 'vscodium'
+
+
+def test_play_opens_the_resolved_video_directly():
+    url = 'https://www.youtube.com/watch?v=kJQP7kiw5Fk'
+    opened = []
+    resolver = StubResolver({'despacito': url})
+    launcher = MediaLauncher(resolver, open_url=opened.append)
+    assert launcher.play('despacito') == 'direct'
+    assert opened == [url]
+    assert resolver.queries == ['despacito']
+
+
+def test_play_without_a_window_title_leaves_the_search_page():
+    opened = []
+    launcher = MediaLauncher(StubResolver(), open_url=opened.append, window_title=lambda: None)
+    started = time.perf_counter()
+    assert launcher.play('despacito') == 'search'
+    assert time.perf_counter() - started < 0.5
+    assert opened == [youtube_search_url('despacito')]
+
+
+def test_play_waits_for_the_title_to_change():
+    titles = iter(['Old video - YouTube'] * 3 + ['despacito - YouTube'])
+    launcher = MediaLauncher(StubResolver(), open_url=lambda url: None,
+                             window_title=lambda: next(titles), ready_timeout=5, settle=0)
+    # An old YouTube tab in front doesn't count as the results page
+    assert launcher._wait_for_results('Old video - YouTube')
+    assert next(titles, None) is None
+
+    launcher = MediaLauncher(StubResolver(), open_url=lambda url: None,
+                             window_title=lambda: 'Old video - YouTube', ready_timeout=0.3)
+    assert launcher.play('despacito') == 'search'
+
+
+def png_size(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data[:8] == PNG_SIGNATURE
+    assert data[12:16] == b'IHDR'
+    return struct.unpack('>II', data[16:24])
+
+
+def test_screenshot_region_is_encoded_in_the_background(tmp_path):
+    source = FakeFramebufferSource(64, 48)
+    capture = ScreenCapture(source, str(tmp_path))
+    saved = []
+    path = capture.capture(capture.region('left'), on_saved=saved.append)
+    assert capture.wait(5)
+    capture.close()
+    assert saved == [path]
+    assert png_size(path) == (32, 48)
+
+
+def test_screenshot_command_replies_once_saved(assistant, tmp_path):
+    assistant.process_command("take screenshot")
+    assert assistant.screen_capture.wait(5)
+    assistant.background.wait(5)
+    assistant.tts.wait(5)
+    files = [name for name in os.listdir(tmp_path) if name.endswith('.png')]
+    assert len(files) == 1
+    assert png_size(tmp_path / files[0]) == (64, 48)
+    assert assistant.tts.backend.spoken[-1] == f"Screenshot saved as {files[0]}"
@@ -0,0 +1,76 @@
+"""Tests for running scripted commands in --batch mode
+
+    python -m pytest tests
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_runner import BatchRunner, read_commands  # noqa: E402
+from media_launcher import StubResolver  # noqa: E402
+
+
+def record_calls(assistant, events, delay=0.1):
+    """Make open/close slow and log when each starts and ends"""
+    lock = threading.Lock()
+
+    def action(kind):
+        def run(name):
+            with lock:
+                events.append(('start', kind, name))
+            time.sleep(delay)
+            with lock:
+                events.append(('end', kind, name))
+        return run
+    assistant.open_application = action('open')
+    assistant.close_application = action('close')
+
+
+def test_launches_overlap_but_finish_before_the_barrier(assistant):
+    events = []
+    record_calls(assistant, events)
+    script = ["open alpha", "open beta", "open gamma", "close beta", "open delta"]
+    started = time.perf_counter()
+    results = BatchRunner(assistant, max_workers=4).run(enumerate(script, 1))
+    elapsed = time.perf_counter() - started
+
+    assert [result.command for result in results] == script
+    assert [result.intent for result in results] == ['open', 'open', 'open', 'close', 'open']
+    close_start = events.index(('start', 'close', 'beta'))
+    for name in ('alpha', 'beta', 'gamma'):
+        assert events.index(('end', 'open', name)) < close_start
+    assert events.index(('start', 'open', 'delta')) > events.index(('end', 'close', 'beta'))
+    # Three opens at once, then the close, then the last open
+    assert elapsed < 0.45
+
+
+def test_exit_stops_the_batch(assistant):
+    events = []
+    record_calls(assistant, events, delay=0)
+    results = BatchRunner(assistant).run(enumerate(["open alpha", "exit", "open beta"], 1))
+    assert [result.command for result in results] == ["open alpha", "exit"]
+    assert results[-1].keep_going is False
+    assert ('start', 'open', 'beta') not in events
+
+
+def test_latency_includes_background_playback(assistant):
+    class SlowResolver(StubResolver):
+        def resolve(self, query):
+            time.sleep(0.3)
+            return super().resolve(query)
+
+    url = 'https://www.youtube.com/watch?v=kJQP7kiw5Fk'
+    opened = []
+    assistant.media_launcher.resolver = SlowResolver({'despacito': url})
+    assistant.media_launcher.open_url = opened.append
+    results = BatchRunner(assistant).run([(1, "play despacito on youtube")])
+    assert opened == [url]
+    assert results[0].latency >= 0.3
+
+
+def test_read_commands_skips_blank_lines_and_comments():
+    lines = ["# warm up\n", "\n", "Open Firefox\n", "  what time is it  \n"]
+    assert list(read_commands(lines)) == [(3, "open firefox"), (4, "what time is it")]
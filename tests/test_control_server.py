@@ -0,0 +1,175 @@
+"""Round trips through the control server over real sockets
+
+    python -m pytest tests
+"""
+import json
+import os
+import socket
+import stat
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from control_server import ControlServer  # noqa: E402
+from tts import NullTTSBackend, TTSWorker  # noqa: E402
+
+
+class Client:
+    """Blocking JSON-lines client"""
+
+    def __init__(self, sock):
+        sock.settimeout(10)
+        self.sock = sock
+        self.file = sock.makefile('rwb')
+
+    def send_raw(self, data):
+        self.file.write(data)
+        self.file.flush()
+
+    def send(self, request):
+        self.send_raw(json.dumps(request).encode('utf-8') + b'\n')
+
+    def receive(self):
+        """Next event, or None once the server has hung up"""
+        line = self.file.readline()
+        return json.loads(line) if line else None
+
+    def until(self, event, request_id):
+        events = []
+        while True:
+            message = self.receive()
+            assert message is not None, f"connection closed after {events}"
+            events.append(message)
+            if message.get('event') == event and message.get('id') == request_id:
+                return events
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+@pytest.fixture
+def unix_server(assistant, tmp_path):
+    server = ControlServer(assistant, f"unix:{tmp_path / 'control.sock'}")
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def tcp_server(assistant, tmp_path):
+    server = ControlServer(assistant, '127.0.0.1:0', token_path=str(tmp_path / 'control.token'))
+    server.start()
+    yield server
+    server.stop()
+
+
+def unix_client(server):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(server.target)
+    return Client(sock)
+
+
+def tcp_client(server):
+    port = server.server.sockets[0].getsockname()[1]
+    return Client(socket.create_connection(('127.0.0.1', port)))
+
+
+def test_command_streams_its_reply_then_done(unix_server):
+    client = unix_client(unix_server)
+    client.send({'id': 7, 'op': 'command', 'text': 'what can you do'})
+    events = client.until('done', 7)
+    replies = [event['text'] for event in events if event['event'] == 'reply']
+    assert len(replies) == 1 and "open ANY application" in replies[0]
+    assert events[-1]['intent'] == 'help' and events[-1]['keep_going'] is True
+    client.send({'id': 8, 'op': 'stats'})
+    assert client.until('result', 8)[-1]['server']['requests'] == 2
+    client.close()
+
+
+def test_unix_socket_is_owner_only(unix_server):
+    assert stat.S_IMODE(os.stat(unix_server.target).st_mode) & 0o077 == 0
+
+
+def test_line_that_is_not_json_closes_the_connection(unix_server):
+    client = unix_client(unix_server)
+    client.send_raw(b'not json\n{"id": 1, "op": "stats"}\n')
+    assert client.receive()['event'] == 'error'
+    assert client.receive() is None
+    client.close()
+
+
+def test_tcp_token_file_is_owner_only(tcp_server):
+    with open(tcp_server.token_path) as f:
+        assert f.read().strip() == tcp_server.token
+    assert stat.S_IMODE(os.stat(tcp_server.token_path).st_mode) & 0o077 == 0
+
+
+def test_tcp_needs_the_token_first(tcp_server):
+    client = tcp_client(tcp_server)
+    client.send({'id': 1, 'op': 'auth', 'token': 'wrong'})
+    assert client.receive() == {'event': 'error', 'error': 'unauthorized', 'id': 1}
+    assert client.receive() is None
+    client.close()
+
+    client = tcp_client(tcp_server)
+    client.send({'id': 1, 'op': 'auth', 'token': tcp_server.token})
+    assert client.receive() == {'event': 'result', 'authenticated': True, 'id': 1}
+    client.send({'id': 2, 'op': 'stats'})
+    assert client.until('result', 2)[-1]['server']['requests'] == 1
+    client.close()
+
+
+def test_browser_post_never_runs_its_body(tcp_server, assistant):
+    commands = []
+    assistant.process_command = lambda *args: commands.append(args) or True
+    client = tcp_client(tcp_server)
+    client.send_raw(b'POST / HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: text/plain\r\n\r\n'
+                    b'\n{"op": "command", "text": "close chrome"}\n')
+    assert client.receive() is None
+    client.close()
+    assert commands == []
+    assert tcp_server.stats['rejected'] == 1
+
+
+class SlowBackend(NullTTSBackend):
+    """Takes a while to say anything, like a real speech engine"""
+
+    def say(self, text):
+        time.sleep(0.3)
+        super().say(text)
+
+
+def test_client_replies_are_not_spoken_by_default(unix_server, assistant):
+    client = unix_client(unix_server)
+    client.send({'id': 1, 'op': 'command', 'text': 'what time is it'})
+    events = client.until('done', 1)
+    assert [event['id'] for event in events] == [1, 1]
+    assert events[0]['text'].startswith("The time is")
+    assistant.tts.wait(5)
+    assert assistant.tts.backend.spoken == []
+    client.close()
+
+
+def test_client_flood_does_not_hold_up_the_voice_loop(unix_server, assistant):
+    assistant.tts.close()
+    assistant.tts = TTSWorker(SlowBackend())
+    client = unix_client(unix_server)
+    for i in range(20):
+        client.send({'id': i, 'op': 'command', 'text': 'what time is it', 'speak': True})
+    time.sleep(0.1)
+    assistant.speak("voice reply")
+    started = time.perf_counter()
+    # What _listen waits for: at most the one client reply already being said
+    assert assistant.tts.wait(ticket=assistant.voice_reply, timeout=3.5)
+    assert time.perf_counter() - started < 1.5
+    done = set()
+    while len(done) < 20:
+        event = client.receive()
+        if event['event'] in ('done', 'error'):
+            done.add(event['id'])
+    assert assistant.tts.skipped > 0
+    client.close()
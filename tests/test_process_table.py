@@ -0,0 +1,115 @@
+"""Tests for matching apps to processes, against a fake /proc tree
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_table import ProcessTable, _program, launch_targets  # noqa: E402
+
+SCRIPT = '/usr/share/foo/foo.py'
+
+
+class FakeProc:
+    """A /proc directory with processes added one at a time"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, 'self'))
+
+    def add(self, pid, argv, exe, comm=None, state='S'):
+        directory = os.path.join(self.root, str(pid))
+        os.makedirs(directory)
+        comm = comm or os.path.basename(argv[0] if argv else exe)[:15]
+        # 'pid (comm) state' then 19 more fields; the 20th after ')' is the start time
+        fields = [state] + ['0'] * 18 + [str(1000 + pid)]
+        with open(os.path.join(directory, 'stat'), 'w') as f:
+            f.write(f"{pid} ({comm}) {' '.join(fields)}\n")
+        with open(os.path.join(directory, 'comm'), 'w') as f:
+            f.write(comm + '\n')
+        with open(os.path.join(directory, 'cmdline'), 'wb') as f:
+            f.write(b''.join(arg.encode() + b'\0' for arg in argv))
+        if exe:
+            os.symlink(exe, os.path.join(directory, 'exe'))
+
+
+@pytest.fixture
+def proc(tmp_path):
+    fake = FakeProc(str(tmp_path / 'proc'))
+    fake.add(101, ['python3', '-c', 'import time; time.sleep(60)'], '/usr/bin/python3.11')
+    fake.add(102, ['/usr/bin/python3', '-u', SCRIPT], '/usr/bin/python3.11')
+    fake.add(103, ['/bin/sh', '-c', 'sleep 60'], '/usr/bin/dash')
+    fake.add(104, ['/usr/bin/gedit', '--new-window'], '/usr/bin/gedit')
+    fake.add(105, ['java', '-Xmx1g', '-jar', '/opt/tool/tool.jar'], '/usr/lib/jvm/bin/java')
+    fake.add(106, ['java', '-jar', '/opt/other/other.jar'], '/usr/lib/jvm/bin/java')
+    fake.add(107, ['/usr/bin/flatpak', 'run', '--branch=stable', 'org.example.Editor'],
+             '/usr/bin/flatpak')
+    fake.add(108, ['python3'], '/usr/bin/python3.11')
+    fake.add(109, [], None, comm='kworker/0:1')
+    fake.add(110, ['/usr/bin/gedit'], '/usr/bin/gedit', state='Z')
+    return ProcessTable(proc=fake.root)
+
+
+def test_program_looks_through_wrappers_and_interpreters():
+    assert _program(['python3', '-u', SCRIPT]) == SCRIPT
+    assert _program(['env', 'A=1', '-u', 'B', 'python3.11', '-m', 'foo']) == 'foo'
+    assert _program(['sh', '-c', 'exec foo --bar']) == 'foo'
+    assert _program(['nice', '-n', '10', 'bash', '/opt/run.sh']) == '/opt/run.sh'
+    assert _program(['flatpak', 'run', '--command=ed', 'org.example.Editor', '%U']) == 'org.example.Editor'
+    assert _program(['snap', 'run', 'spotify']) == 'spotify'
+    assert _program(['java', '-cp', 'lib.jar', '-jar', 'tool.jar']) == 'tool.jar'
+    assert _program(['/usr/bin/gedit', 'file.txt']) == '/usr/bin/gedit'
+    assert _program(['python3']) == 'python3'
+
+
+def test_program_is_none_for_inline_code_or_nothing():
+    assert _program(['python3', '-c', 'print(1)']) is None
+    assert _program(['node', '-e', '1']) is None
+    assert _program(['env']) is None
+    assert _program(['sh', '-c']) is None
+    assert _program(['flatpak', 'info', 'org.example.Editor']) is None
+
+
+def test_launch_targets_never_target_the_interpreter():
+    paths, names = launch_targets(f'python3 {SCRIPT}')
+    assert names == {'foo.py'}
+    assert all(os.path.basename(path) == 'foo.py' for path in paths)
+    assert launch_targets("sh -c 'python3 -c \"print(1)\"'") == (set(), set())
+    assert launch_targets('env') == (set(), set())
+    assert 'org.example.Editor' in launch_targets('flatpak run org.example.Editor')[1]
+
+
+def test_script_close_leaves_other_python_processes_alone(proc):
+    assert proc.find(f'python3 {SCRIPT}') == [102]
+    assert proc.find(f'env LANG=C python3 -u {SCRIPT}') == [102]
+
+
+def test_shell_and_java_wrappers_match_their_program_only(proc):
+    assert proc.find('sh -c "sleep 60"') == [103]
+    assert proc.find('java -jar /opt/tool/tool.jar') == [105]
+    assert proc.find('flatpak run org.example.Editor') == [107]
+
+
+def test_ambiguous_exec_lines_match_nothing(proc):
+    assert proc.find('python3 -c "import time"') == []
+    assert proc.find('env') == []
+
+
+def test_plain_executables_match_by_path_and_name(proc):
+    # The zombie 110 is skipped
+    assert proc.find('/usr/bin/gedit') == [104]
+    assert proc.find('gedit %U') == [104]
+
+
+def test_bare_interpreter_matches_only_the_repl(proc):
+    assert proc.find('python3') == [108]
+
+
+def test_refresh_forgets_exited_processes(proc, tmp_path):
+    assert proc.find('/usr/bin/gedit') == [104]
+    os.rename(os.path.join(proc.proc, '104'), os.path.join(proc.proc, 'gone'))
+    assert proc.find('/usr/bin/gedit') == []
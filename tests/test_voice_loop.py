@@ -0,0 +1,73 @@
+"""The voice loop's waits give up once the session has been ended elsewhere
+
+    python -m pytest tests
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speech_backends import ListenTimeout, StreamingListener  # noqa: E402
+from wake_word import WakeWordDetector  # noqa: E402
+
+
+class SilentSource:
+    """A live microphone in a quiet room: silence, forever, in real time"""
+
+    sample_rate = 16000
+    sample_width = 2
+    frame_seconds = 0.01
+
+    def frames(self):
+        frame = bytes(int(self.sample_rate * self.frame_seconds) * self.sample_width)
+        while True:
+            time.sleep(self.frame_seconds)
+            yield frame
+
+    def discard_pending(self):
+        pass
+
+
+class NeverSpotter:
+    def accept(self, frame):
+        return False
+
+    def reset(self):
+        pass
+
+
+class NullRecognizer:
+    def start(self, sample_rate, sample_width):
+        pass
+
+    def accept(self, frame):
+        pass
+
+    def finish(self):
+        return ''
+
+
+def stop_soon(delay=0.2):
+    stop = threading.Event()
+    threading.Timer(delay, stop.set).start()
+    return stop
+
+
+def test_wake_wait_returns_when_stopped():
+    detector = WakeWordDetector(SilentSource(), NeverSpotter())
+    started = time.perf_counter()
+    assert detector.wait(stop=stop_soon()) is False
+    assert time.perf_counter() - started < 2
+
+
+def test_listen_gives_up_when_stopped():
+    listener = StreamingListener(SilentSource(), NullRecognizer())
+    listener.calibrated = True
+    started = time.perf_counter()
+    with pytest.raises(ListenTimeout):
+        listener.listen(timeout=30, stop=stop_soon())
+    assert time.perf_counter() - started < 2
@@ -0,0 +1,188 @@
+import json
+import math
+import random
+import threading
+import time
+from itertools import count
+
+# Histogram buckets grow by 2**(1/4) (~19%) from 1 µs; 120 of them reach
+# past 17 minutes, anything longer lands in the last bucket
+BUCKET_BASE = 1e-6
+BUCKET_GROWTH = 2 ** 0.25
+BUCKET_COUNT = 120
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+class Histogram:
+    """Latency histogram with log-spaced buckets; percentiles are bucket upper bounds"""
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= BUCKET_BASE:
+            index = 0
+        else:
+            index = min(int(math.log(seconds / BUCKET_BASE) / _LOG_GROWTH), BUCKET_COUNT - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank and bucket:
+                return min(BUCKET_BASE * BUCKET_GROWTH ** (index + 1), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p90_ms': self.percentile(90) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class Span:
+    """One timed stage; use through Tracer.span() as a context manager"""
+
+    def __init__(self, tracer, name, trace_id, parent, sampled, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.parent = parent
+        self.sampled = sampled
+        self.attrs = attrs
+        self.started = 0.0
+        self.seconds = 0.0
+
+    def set(self, **attrs):
+        """Attach attributes discovered while the span is open (e.g. the intent)"""
+        if self.sampled:
+            self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.tracer._stack().append(self)
+        if self.sampled:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.sampled:
+            self.seconds = time.perf_counter() - self.started
+            if exc_type is not None:
+                self.attrs['error'] = exc_type.__name__
+            self.tracer._finish(self)
+        self.tracer._stack().pop()
+        return False
+
+
+class Tracer:
+    """Spans and per-stage latency histograms for the command pipeline
+
+    A span opened with nothing else open on its thread starts a trace and
+    decides, with probability sample_rate, whether the whole trace is
+    recorded; nested spans follow that decision. Unsampled spans cost a
+    list append and pop. Finished sampled spans go into a histogram per
+    name and, with export_path, one JSON line each.
+    """
+
+    def __init__(self, sample_rate=1.0, export_path=None):
+        self.sample_rate = sample_rate
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._trace_ids = count(1)
+        self._export = open(export_path, 'a', encoding='utf-8') if export_path else None
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _sample(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def span(self, name, **attrs):
+        stack = self._stack()
+        if stack:
+            parent = stack[-1]
+            return Span(self, name, parent.trace_id, parent.name, parent.sampled, attrs)
+        sampled = self._sample()
+        return Span(self, name, next(self._trace_ids) if sampled else 0, None, sampled, attrs)
+
+    def record(self, name, seconds, **attrs):
+        """Add a stage that was timed elsewhere (e.g. listener.last_timing)"""
+        stack = self._stack()
+        if stack:
+            parent = stack[-1]
+            if not parent.sampled:
+                return
+            span = Span(self, name, parent.trace_id, parent.name, True, attrs)
+        elif self._sample():
+            span = Span(self, name, next(self._trace_ids), None, True, attrs)
+        else:
+            return
+        span.started = time.perf_counter() - seconds
+        span.seconds = seconds
+        self._finish(span)
+
+    def _finish(self, span):
+        with self._lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = Histogram()
+            histogram.add(span.seconds)
+            if self._export is not None:
+                record = {'trace': span.trace_id, 'span': span.name, 'parent': span.parent,
+                          'ts': time.time() - span.seconds, 'ms': round(span.seconds * 1000, 3)}
+                record.update(span.attrs)
+                self._export.write(json.dumps(record) + '\n')
+
+    def snapshot(self):
+        """{stage name: summary dict}, sorted by name"""
+        with self._lock:
+            return {name: self.histograms[name].summary() for name in sorted(self.histograms)}
+
+    def report(self):
+        """Per-stage latency table as printable lines"""
+        stats = self.snapshot()
+        if not stats:
+            return ["   (nothing recorded yet)"]
+        width = max(len(name) for name in stats)
+        lines = [f"   {'stage':<{width}}  {'count':>6}  {'p50':>9}  {'p90':>9}  {'p99':>9}  {'max':>9}"]
+        for name, summary in stats.items():
+            lines.append(f"   {name:<{width}}  {summary['count']:>6}  {summary['p50_ms']:>7.1f}ms  "
+                         f"{summary['p90_ms']:>7.1f}ms  {summary['p99_ms']:>7.1f}ms  {summary['max_ms']:>7.1f}ms")
+        return lines
+
+    def slowest(self, exclude=()):
+        """(stage, p90 seconds) with the highest p90, or None"""
+        with self._lock:
+            names = [name for name in self.histograms if name not in exclude]
+            if not names:
+                return None
+            name = max(names, key=lambda name: self.histograms[name].percentile(90))
+            return name, self.histograms[name].percentile(90)
+
+    def close(self):
+        with self._lock:
+            if self._export is not None:
+                self._export.close()
+                self._export = None
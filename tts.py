@@ -0,0 +1,414 @@
+import hashlib
+import io
+import os
+import queue
+import tempfile
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+
+class NullTTSBackend:
+    """Text-only backend for headless runs; remembers what it would have said"""
+
+    name = 'null'
+
+    def __init__(self):
+        self.spoken = []
+
+    def open(self):
+        pass
+
+    def say(self, text):
+        self.spoken.append(text)
+
+    def say_many(self, texts):
+        self.say(' '.join(texts))
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Pyttsx3Backend:
+    """pyttsx3 speech; the engine is created on the worker thread that uses it"""
+
+    name = 'pyttsx3'
+
+    def __init__(self, rate=160, volume=0.9):
+        self.rate = rate
+        self.volume = volume
+        self.engine = None
+
+    def open(self):
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        self.engine.setProperty('rate', self.rate)
+        self.engine.setProperty('volume', self.volume)
+
+    def say(self, text):
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+    def say_many(self, texts):
+        self.say(' '.join(texts))
+
+    def stop(self):
+        if self.engine is not None:
+            self.engine.stop()
+
+    def close(self):
+        self.stop()
+
+
+class PhraseCache:
+    """LRU of rendered phrase audio, bounded by total bytes
+
+    With a directory the rendered WAV files are also kept on disk, so
+    phrases rendered in an earlier session replay straight away; the
+    directory has the same byte budget, oldest files going first. Only
+    phrases asked for at least min_uses times are worth rendering, so
+    one-offs ("The time is 01:59 PM") are never written.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, directory=None, min_uses=2, max_seen=1000):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.min_uses = min_uses
+        self.max_seen = max_seen
+        self.entries = OrderedDict()
+        self.size = 0
+        # Misses per phrase, for phrases not rendered yet
+        self.seen = OrderedDict()
+        # Files in directory, least recently used first: path -> bytes
+        self.files = OrderedDict()
+        self.disk_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.render_seconds = 0.0
+        self.renders = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_directory()
+
+    def _load_directory(self):
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.wav') and entry.is_file():
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.path, stat.st_size))
+        for _, path, size in sorted(found):
+            self.files[path] = size
+            self.disk_size += size
+        self._trim_directory()
+
+    def _disk_path(self, text):
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.wav")
+
+    def get(self, text):
+        audio = self.entries.get(text)
+        if audio is not None:
+            self.entries.move_to_end(text)
+        elif self.directory:
+            path = self._disk_path(text)
+            try:
+                with open(path, 'rb') as f:
+                    audio = f.read()
+            except OSError:
+                audio = None
+            if audio is not None:
+                self._remember(text, audio)
+                self._touch(path, len(audio))
+        if audio is None:
+            self.misses += 1
+            self.seen[text] = self.seen.pop(text, 0) + 1
+            if len(self.seen) > self.max_seen:
+                self.seen.popitem(last=False)
+        else:
+            self.hits += 1
+        return audio
+
+    def worth_rendering(self, text):
+        """True once text has missed often enough to be a stock phrase"""
+        return self.seen.get(text, 0) >= self.min_uses
+
+    def put(self, text, audio, render_seconds=0.0):
+        self.renders += 1
+        self.render_seconds += render_seconds
+        self.seen.pop(text, None)
+        self._remember(text, audio)
+        if self.directory and len(audio) <= self.max_bytes:
+            path = self._disk_path(text)
+            try:
+                with open(path, 'wb') as f:
+                    f.write(audio)
+            except OSError:
+                return
+            self._touch(path, len(audio))
+            self._trim_directory()
+
+    def _touch(self, path, size):
+        """Mark a file as just used (its mtime survives between sessions)"""
+        self.disk_size += size - self.files.pop(path, 0)
+        self.files[path] = size
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _trim_directory(self):
+        while self.disk_size > self.max_bytes and self.files:
+            path, size = self.files.popitem(last=False)
+            self.disk_size -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, text, audio):
+        if len(audio) > self.max_bytes:
+            return
+        old = self.entries.pop(text, None)
+        if old is not None:
+            self.size -= len(old)
+        self.entries[text] = audio
+        self.size += len(audio)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        average_render = self.render_seconds / self.renders if self.renders else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'render_seconds': self.render_seconds,
+            # Rendering time the hits would have cost
+            'saved_seconds': self.hits * average_render,
+        }
+
+
+class CachedPyttsx3Backend(Pyttsx3Backend):
+    """pyttsx3 rendered to WAV once per phrase and replayed from PhraseCache
+
+    Each message is cached separately (coalesced messages are played back
+    to back) so "Opening firefox" hits no matter what it was queued with.
+    A phrase is spoken directly until it comes up again; only then is it
+    rendered, so one-off replies don't pay for the extra WAV round trip.
+    Falls back to plain pyttsx3 if the engine can't render WAV files.
+    """
+
+    name = 'cached'
+
+    def __init__(self, cache=None, rate=160, volume=0.9):
+        super().__init__(rate, volume)
+        self.cache = cache or PhraseCache()
+        self.audio = None
+        self.stopped = threading.Event()
+        self.can_render = True
+
+    def open(self):
+        super().open()
+        import pyaudio
+        self.audio = pyaudio.PyAudio()
+
+    def say(self, text):
+        self.say_many([text])
+
+    def say_many(self, texts):
+        self.stopped.clear()
+        for text in texts:
+            if self.stopped.is_set():
+                return
+            audio = self.cache.get(text) if self.can_render else None
+            if audio is None and self.can_render and self.cache.worth_rendering(text):
+                audio = self._render(text)
+            if audio is None:
+                super().say(text)
+            else:
+                self._play(audio)
+
+    def _render(self, text):
+        """Synthesize text to WAV bytes and cache them"""
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            started = time.perf_counter()
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with open(path, 'rb') as f:
+                audio = f.read()
+            # Some drivers (macOS) write AIFF; those are spoken uncached
+            wave.open(io.BytesIO(audio), 'rb').close()
+        except (OSError, EOFError, wave.Error):
+            self.can_render = False
+            return None
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.cache.put(text, audio, time.perf_counter() - started)
+        return audio
+
+    def _play(self, audio, chunk=2048):
+        with wave.open(io.BytesIO(audio), 'rb') as wav:
+            stream = self.audio.open(format=self.audio.get_format_from_width(wav.getsampwidth()),
+                                     channels=wav.getnchannels(), rate=wav.getframerate(),
+                                     output=True)
+            try:
+                data = wav.readframes(chunk)
+                while data and not self.stopped.is_set():
+                    stream.write(data)
+                    data = wav.readframes(chunk)
+            finally:
+                stream.stop_stream()
+                stream.close()
+
+    def stop(self):
+        self.stopped.set()
+        super().stop()
+
+    def close(self):
+        super().close()
+        if self.audio is not None:
+            self.audio.terminate()
+            self.audio = None
+
+
+def create_tts_backend(name, cache_dir=None, cache_bytes=16 * 1024 * 1024):
+    """TTS backend by name: 'pyttsx3', 'cached' or 'null'"""
+    if name == 'null':
+        return NullTTSBackend()
+    if name == 'pyttsx3':
+        return Pyttsx3Backend()
+    if name == 'cached':
+        return CachedPyttsx3Backend(PhraseCache(cache_bytes, cache_dir))
+    raise ValueError(f"unknown TTS backend: {name}")
+
+
+class TTSWorker:
+    """Speaks queued messages on its own thread so callers never block
+
+    Messages that pile up while something is being said are coalesced into
+    one utterance. cancel() drops everything queued and cuts off the current
+    utterance, for barge-in when the user starts a new command. If the
+    backend fails to open, the worker carries on with NullTTSBackend.
+    say() returns a ticket; wait(ticket=...) waits for that message (and
+    the ones before it) without waiting for anything queued later.
+    """
+
+    def __init__(self, backend, tracer=None):
+        self.backend = backend
+        # Optional tracing.Tracer; each utterance becomes a 'tts.say' span
+        self.tracer = tracer
+        self.queue = queue.Queue()
+        self.idle = threading.Event()
+        self.idle.set()
+        # Tickets of messages queued or being spoken; idle is set when empty
+        self._unfinished = set()
+        self._tickets = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        # Messages said with if_idle=True that were skipped
+        self.skipped = 0
+        # Why the backend couldn't be opened, if it couldn't
+        self.error = None
+        self.thread = threading.Thread(target=self._loop, name="tts", daemon=True)
+        self.thread.start()
+
+    def say(self, text, if_idle=False):
+        """Queue text; returns its ticket
+
+        With if_idle, text is skipped (and the last ticket returned) unless
+        nothing else is queued or being spoken, so these messages can never
+        pile up.
+        """
+        with self._lock:
+            if if_idle and self._unfinished:
+                self.skipped += 1
+                return self._tickets
+            self._tickets += 1
+            self._unfinished.add(self._tickets)
+            self.idle.clear()
+            self.queue.put((self._generation, self._tickets, text))
+            return self._tickets
+
+    def cancel(self):
+        """Drop queued messages and stop the one being spoken"""
+        with self._lock:
+            self._generation += 1
+            self._done(self._drain())
+        self.backend.stop()
+
+    def wait(self, timeout=None, ticket=None):
+        """Block until everything queued so far (or up to ticket) has been spoken"""
+        if ticket is None:
+            return self.idle.wait(timeout)
+        with self._finished:
+            return self._finished.wait_for(
+                lambda: not any(pending <= ticket for pending in self._unfinished), timeout)
+
+    def close(self, wait=True):
+        if wait:
+            self.wait()
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def _drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _done(self, items):
+        """Account for finished or dropped messages (call with _lock held)"""
+        self._unfinished.difference_update(item[1] for item in items if item is not None)
+        if not self._unfinished:
+            self.idle.set()
+        self._finished.notify_all()
+
+    def _loop(self):
+        try:
+            self.backend.open()
+        except Exception as e:
+            # Keep draining the queue so wait() and close() still return;
+            # speak() prints every reply anyway
+            self.error = e
+            print(f"⚠️  Speech output unavailable ({e}); replies will only be printed")
+            print("   pip install pyttsx3 pyaudio")
+            self.backend = NullTTSBackend()
+        while True:
+            item = self.queue.get()
+            # Everything else already waiting goes out in the same breath
+            with self._lock:
+                items = [item] + self._drain()
+                generation = self._generation
+            texts = [text for item_generation, _, text in filter(None, items)
+                     if item_generation == generation]
+            if texts:
+                try:
+                    if self.tracer is not None:
+                        with self.tracer.span('tts.say', messages=len(texts)):
+                            self.backend.say_many(texts)
+                    else:
+                        self.backend.say_many(texts)
+                except Exception as e:
+                    print(f"Speech output failed: {e}")
+            with self._lock:
+                self._done(items)
+            if None in items:
+                break
+        self.backend.close()
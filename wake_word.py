@@ -0,0 +1,123 @@
+import json
+import time
+from collections import deque
+
+from speech_backends import EnergyVAD, ServiceUnavailable
+
+
+class VoskKeywordSpotter:
+    """Spots one wake phrase with a Vosk decoder restricted to that phrase
+
+    With a grammar of just the wake words plus "[unk]" the decoder search
+    space is tiny, so this costs a fraction of full recognition.
+    """
+
+    def __init__(self, model_path, phrase, sample_rate=16000):
+        try:
+            import vosk
+        except ImportError:
+            raise ServiceUnavailable("the wake word needs vosk (pip install vosk)")
+        vosk.SetLogLevel(-1)
+        try:
+            model = vosk.Model(model_path)
+        except Exception as e:
+            raise ServiceUnavailable(f"could not load Vosk model from {model_path}: {e}")
+        self.phrase = ' '.join(phrase.lower().split())
+        grammar = json.dumps([self.phrase, '[unk]'])
+        self.decoder = vosk.KaldiRecognizer(model, sample_rate, grammar)
+
+    def accept(self, frame):
+        """Feed one frame; True as soon as the wake phrase has been heard"""
+        if self.decoder.AcceptWaveform(frame):
+            text = json.loads(self.decoder.Result()).get('text', '')
+        else:
+            text = json.loads(self.decoder.PartialResult()).get('partial', '')
+        if self.phrase in text:
+            self.decoder.Reset()
+            return True
+        return False
+
+    def reset(self):
+        self.decoder.Reset()
+
+
+class WakeWordDetector:
+    """Cheap always-on stage in front of full recognition
+
+    Frames only reach the keyword spotter while the VAD hears something, so
+    a quiet room costs one RMS per frame. Keeps CPU counters for the
+    waiting thread so idle cost can be reported.
+    """
+
+    def __init__(self, source, spotter, vad=None, preroll=0.3, end_silence=0.8):
+        self.source = source
+        self.spotter = spotter
+        self.vad = vad or EnergyVAD()
+        self.preroll = preroll
+        self.end_silence = end_silence
+        self.stats = {'frames': 0, 'spotted_frames': 0, 'detections': 0,
+                      'cpu_seconds': 0.0, 'wall_seconds': 0.0}
+        # Seconds into the source at which each detection happened
+        self.detection_times = []
+        self._position = 0.0
+
+    def wait(self, stop=None):
+        """Block until the wake phrase is heard
+
+        Returns False instead if the threading.Event stop gets set first
+        (checked every frame). Raises EOFError if a file source runs out.
+        """
+        frame_seconds = self.source.frame_seconds
+        sample_width = self.source.sample_width
+        pending = deque(maxlen=max(int(self.preroll / frame_seconds), 1))
+        active = False
+        silence = 0.0
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        try:
+            for frame in self.source.frames():
+                if stop is not None and stop.is_set():
+                    return False
+                self.stats['frames'] += 1
+                self._position += frame_seconds
+                is_speech = self.vad.is_speech(frame, sample_width)
+
+                if not active:
+                    pending.append(frame)
+                    if not is_speech:
+                        continue
+                    # Speech started: catch the spotter up on the pre-roll
+                    active = True
+                    silence = 0.0
+                    frames = list(pending)
+                    pending.clear()
+                else:
+                    frames = [frame]
+                    silence = 0.0 if is_speech else silence + frame_seconds
+
+                for buffered in frames:
+                    self.stats['spotted_frames'] += 1
+                    if self.spotter.accept(buffered):
+                        self.stats['detections'] += 1
+                        self.detection_times.append(self._position)
+                        return True
+
+                if silence >= self.end_silence:
+                    # Someone talked without the wake word; start over quietly
+                    active = False
+                    self.spotter.reset()
+            raise EOFError()
+        finally:
+            self.stats['cpu_seconds'] += time.thread_time() - cpu_start
+            self.stats['wall_seconds'] += time.perf_counter() - wall_start
+
+    def cpu_percent(self):
+        """CPU used by the wake stage as a share of one core while waiting"""
+        wall = self.stats['wall_seconds']
+        return 100.0 * self.stats['cpu_seconds'] / wall if wall else 0.0
+
+    def report(self):
+        stats = self.stats
+        gated = stats['spotted_frames'] / stats['frames'] * 100 if stats['frames'] else 0.0
+        return (f"wake stage: {self.cpu_percent():.1f}% CPU over {stats['wall_seconds']:.0f}s, "
+                f"{gated:.0f}% of frames decoded, {stats['detections']} wake-ups")